@@ -1,4 +1,6 @@
 import random
+import threading
+import time
 from enum import Enum
 from go.types import Position, Color
 from go.game import Game, GameEventListener, GameEventType
@@ -6,14 +8,35 @@ from go import rules
 from go.player import Player
 from ai.queue import PriorityQueue
 from ai.strategies import *
+from ai.mcts import MCTS, PASS
+from ai.rollout import rollout_move
 
 THINKING_DURATION_MS = 800
+MAX_THINKING_MS = 10000 # Time limit of a decision made in the background
+MIN_MOVES_LEFT = 10 # Moves the rest of the clock is spread over, at least
 
 class AIPlayer(Player, GameEventListener):
     valid_strategies: dict[Strategy, bool]
+    mcts: MCTS | None # Search used instead of the heuristic strategies, if set
+    ponder: bool # Keep searching during the opponent's turn, only with mcts
+    ponder_stop: threading.Event | None
+    ponder_thread: threading.Thread | None
+    move_time_ms: float | None # Hard limit of a single decision
+    clock_ms: float | None # Time left for the rest of the game, None without a clock
+    last_move_ms: float # Time taken by the last decision
+    longest_move_ms: float
 
-    def __init__(self, color: Color):
+    def __init__(self, color: Color, mcts: MCTS | None = None, ponder: bool = False,
+                 move_time_ms: float | None = None, clock_ms: float | None = None):
         super().__init__(color)
+        self.mcts = mcts
+        self.ponder = ponder
+        self.ponder_stop = None
+        self.ponder_thread = None
+        self.move_time_ms = move_time_ms
+        self.clock_ms = clock_ms
+        self.last_move_ms = 0
+        self.longest_move_ms = 0
         self.valid_strategies = {}
         for strategy in Strategy:
             self.valid_strategies[strategy] = True
@@ -38,42 +61,95 @@ class AIPlayer(Player, GameEventListener):
         for strategy in Strategy:
             self.valid_strategies[strategy] = True
 
-    def decide_move(self, game: Game) -> Position:
+    # Search the position of the game on a thread while the opponent decides.
+    # The statistics go into the table of the search, so whatever the
+    # opponent plays, the next decision finds that position already explored.
+    # It starts again only once the last one was stopped and has ended: one
+    # that ran all its playouts is done for this turn
+    def start_pondering(self, game: Game):
+        if self.mcts is None or not self.ponder:
+            return
+        if self.ponder_thread is not None:
+            if self.ponder_thread.is_alive() or not self.ponder_stop.is_set():
+                return
+            self.ponder_thread = None
+        self.ponder_stop = threading.Event()
+        self.ponder_thread = threading.Thread(target=self.mcts.ponder, args=(game.snapshot(), self.ponder_stop),
+                                              name="ai-ponder", daemon=True)
+        self.ponder_thread.start()
+
+    # Ask the pondering to stop after its current playout, without waiting
+    # for it: this runs on the frame loop. The next decision waits instead
+    def stop_pondering(self):
+        if self.ponder_stop is not None:
+            self.ponder_stop.set()
+
+    # Stop pondering and wait for the thread, so it's done with the table
+    # before a search starts. Called by the decision, off the frame loop
+    def wait_pondering(self):
+        thread = self.ponder_thread
+        if thread is None:
+            return
+        self.stop_pondering()
+        thread.join()
+
+    # Time to spend on the next move: the per-move limit, or the clock
+    # spread over the moves that are likely left, whichever is shorter
+    def time_budget_ms(self, game: Game) -> float | None:
+        budget = self.move_time_ms
+        if self.clock_ms is not None:
+            moves_left = max(len(game.board.empty) // 2, MIN_MOVES_LEFT)
+            share = self.clock_ms / moves_left
+            budget = share if budget is None else min(budget, share)
+        return budget
+
+    # Decide the next move within the time budget, charging the time taken
+    # to the clock. The stop event asks a search to return its best move so far
+    def decide_move(self, game: Game, stop: threading.Event | None = None) -> Position:
+        self.wait_pondering()
+        start = time.perf_counter()
+        budget = self.time_budget_ms(game)
+        deadline = None if budget is None else start + budget / 1000
+        move = self.choose_move(game, stop, deadline)
+        self.last_move_ms = (time.perf_counter() - start) * 1000
+        self.longest_move_ms = max(self.longest_move_ms, self.last_move_ms)
+        if self.clock_ms is not None:
+            self.clock_ms = max(self.clock_ms - self.last_move_ms, 0)
+        return move
+
+    # Once the deadline is over, the search returns the best move found so far.
+    # The heuristic strategies have none, they fall back to a quick random move
+    def choose_move(self, game: Game, stop: threading.Event | None, deadline: float | None) -> Position:
+        if self.mcts is not None:
+            return self.mcts.search(game, stop, deadline)
+        if (stop is not None and stop.is_set()) or (deadline is not None and time.perf_counter() >= deadline):
+            return self.fallback_move(game)
         print("iterationstart")
         if game.turn == 1:
             return self.play_opening(game)
         if game.is_white_turn:
             own_color = Color.WHITE
             enemy_color = Color.BLACK
-            own_groups = game.board.white_groups
-            enemy_groups = game.board.black_groups
         else:
             own_color = Color.BLACK
             enemy_color = Color.WHITE
-            own_groups = game.board.black_groups
-            enemy_groups = game.board.white_groups
         chosen_strategy = None
         next_move = None
         # Check if there is any enemy group in atari
-        enemy_in_atari = None
-        for group in enemy_groups:
-            if len(rules.get_liberties(game.board, group)) == 1:
-                enemy_in_atari = group
-                break
+        enemy_atari = rules.chains_in_atari(game.board, enemy_color)
+        enemy_in_atari = enemy_atari[0] if enemy_atari else None
         if enemy_in_atari is not None and self.valid_strategies[Strategy.ATTACK_ATARI]: # If there is an enemy group in atari, attack it
             chosen_strategy = Strategy.ATTACK_ATARI
         else:
             # Check if there is any own group in atari
-            in_atari = None
-            for group in own_groups:
-                if len(rules.get_liberties(game.board, group)) == 1:
-                    in_atari = group
-                    break
+            own_atari = rules.chains_in_atari(game.board, own_color)
+            in_atari = own_atari[0] if own_atari else None
             if in_atari is not None and self.valid_strategies[Strategy.DEFEND_ATARI]: # If there is a group in atari, defend it
                 chosen_strategy = Strategy.DEFEND_ATARI
             else: # Else attack weakest group or play randomly
                 picked_attack_weakest = random.choice((True, False))
-                if picked_attack_weakest and self.valid_strategies[Strategy.ATTACK_WEAKEST]:
+                weakest = rules.weakest_chain(game.board, enemy_color)
+                if picked_attack_weakest and weakest is not None and self.valid_strategies[Strategy.ATTACK_WEAKEST]:
                     chosen_strategy = Strategy.ATTACK_WEAKEST
                 else: # Playing random can always be valid
                     chosen_strategy = Strategy.RANDOM
@@ -83,7 +159,7 @@ class AIPlayer(Player, GameEventListener):
             case Strategy.DEFEND_ATARI:
                 next_move = handle_atari(game, in_atari) 
             case Strategy.ATTACK_WEAKEST:
-                next_move = attack_weakest(game, enemy_groups)
+                next_move = attack_weakest(game, weakest)
             case Strategy.RANDOM:
                 next_move = random_move(game, own_color)
         if next_move == Position(-1, -1):
@@ -93,10 +169,21 @@ class AIPlayer(Player, GameEventListener):
             return next_move
         else:
             self.valid_strategies[chosen_strategy] = False
-            return self.decide_move(game)
+            return self.choose_move(game, stop, deadline)
     
+    # A random legal move that doesn't fill an own eye, found in constant time
+    def fallback_move(self, game: Game) -> Position:
+        index = rollout_move(game.board, self.color.value)
+        return PASS if index is None else game.board.position(index)
+
     def on_game_event(self, event):
         match event.type:
             case GameEventType.STONE_PLACED:
                 if event.player.color != self.color:
-                    self.thinking = True
\ No newline at end of file
+                    self.stop_pondering()
+                    self.thinking = True
+            case GameEventType.TURN_PASSED:
+                if event.player.color != self.color:
+                    self.stop_pondering()
+            case GameEventType.SCORING_STARTED | GameEventType.GAME_FINISHED:
+                self.stop_pondering()
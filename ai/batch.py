@@ -0,0 +1,205 @@
+import numpy as np
+from go.types import Color
+from go.board import Board
+
+EMPTY = Color.EMPTY.value
+BLACK = Color.BLACK.value
+WHITE = Color.WHITE.value
+
+# Runs many independent random playouts at once. The K boards are stored
+# as a (K, N, N) array, and every step plays one move on each unfinished
+# board with array operations instead of per-board Python loops.
+# Playouts are light: uniformly random moves that don't fill own eyes,
+# with simple ko forbidden and positional superko ignored
+class BatchPlayouts:
+    boards: np.ndarray # (K, N, N) int8 array of Color values
+    to_move: np.ndarray # (K,) color value of the player to move on each board
+    passes: np.ndarray # (K,) consecutive passes on each board
+    ko: np.ndarray # (K, N, N) points that can't be played right now because of ko
+    moves: np.ndarray # (K,) moves played on each board, passes included
+    labels: np.ndarray # (K, N, N) chain of every stone, as the flat index of one of its stones
+
+    def __init__(self, boards: np.ndarray, to_move: np.ndarray, seed: int | None = None):
+        self.boards = np.array(boards, dtype=np.int8)
+        self.to_move = np.array(to_move, dtype=np.int8)
+        count = self.boards.shape[0]
+        self.passes = np.zeros(count, dtype=np.int8)
+        self.ko = np.zeros(self.boards.shape, dtype=bool)
+        self.moves = np.zeros(count, dtype=np.int32)
+        self.labels = chain_labels(self.boards)
+        self.rng = np.random.default_rng(seed)
+
+    # Start count playouts from the position of a board
+    @classmethod
+    def from_board(cls, board: Board, color: Color, count: int, seed: int | None = None) -> "BatchPlayouts":
+        grid = board_to_array(board)
+        boards = np.broadcast_to(grid, (count, *grid.shape))
+        return cls(boards, np.full(count, color.value), seed)
+
+    # Boards where both players passed
+    @property
+    def finished(self) -> np.ndarray:
+        return self.passes >= 2
+
+    # Play until every board is finished or has reached max_moves
+    def run(self, max_moves: int | None = None):
+        if max_moves is None:
+            max_moves = self.boards.shape[1] * self.boards.shape[2] * 2
+        while True:
+            active = ~self.finished & (self.moves < max_moves)
+            if not active.any():
+                break
+            self.step(active)
+
+    # Play one random legal move, or pass, on each active board.
+    # A point is legal when it has an empty neighbor, captures an opponent
+    # chain in atari or joins an own chain that keeps a liberty, so boards
+    # pass only when none of their candidates is legal
+    def step(self, active: np.ndarray):
+        boards = self.boards
+        own = self.to_move[:, None, None]
+        opponent = np.where(own == BLACK, WHITE, BLACK).astype(np.int8)
+        empty = boards == EMPTY
+        labels = self.labels
+        atari = atari_stones(boards, labels)
+        # Candidates: legal empty points that aren't own eyes nor ko
+        candidates = empty & ~all_neighbors(boards == own) & ~self.ko & active[:, None, None]
+        candidates &= any_neighbor(empty) | any_neighbor((boards == opponent) & atari) | any_neighbor((boards == own) & ~atari)
+        # Pick one candidate per board at random
+        scores = np.where(candidates, self.rng.random(boards.shape), -1.0)
+        flat = scores.reshape(len(boards), -1).argmax(axis=1)
+        has_move = candidates.reshape(len(boards), -1).any(axis=1)
+        rows, cols = np.divmod(flat, boards.shape[2])
+        playing = np.flatnonzero(has_move)
+        placed = np.zeros(boards.shape, dtype=bool)
+        placed[playing, rows[playing], cols[playing]] = True
+        # Remove the opponent chains in atari next to the moves
+        taken = np.where(any_neighbor(placed) & (boards == opponent) & atari, labels, -1)
+        captured = np.zeros(boards.size, dtype=bool)
+        captured[taken[taken >= 0]] = True
+        captured = captured[labels] & (boards == opponent)
+        boards[captured] = EMPTY
+        boards[playing, rows[playing], cols[playing]] = self.to_move[playing]
+        # Captured points are empty again, and the own chains next to a move
+        # join the chain of its stone
+        index = np.arange(boards.size, dtype=np.int32).reshape(boards.shape)
+        labels[captured] = index[captured]
+        joined = any_neighbor(placed) & (boards == own)
+        relabel = np.arange(boards.size, dtype=np.int32)
+        relabel[labels[joined]] = index[placed][np.searchsorted(playing, np.flatnonzero(joined) // boards[0].size)]
+        labels[:] = relabel[labels]
+        # Simple ko: a lone stone that captured exactly one stone and has
+        # that point as its only liberty can't be retaken right away
+        single = captured.reshape(len(boards), -1).sum(axis=1) == 1
+        lone = ~(any_neighbor(boards == own) & placed).any(axis=(1, 2))
+        liberties = np.where(placed, count_neighbors(boards == EMPTY), 0).sum(axis=(1, 2))
+        self.ko = captured & (single & lone & (liberties == 1))[:, None, None]
+        # Update the turn of the active boards
+        self.passes = np.where(active, np.where(has_move, 0, self.passes + 1), self.passes).astype(np.int8)
+        self.moves += active
+        self.to_move = np.where(active, np.where(self.to_move == BLACK, WHITE, BLACK), self.to_move).astype(np.int8)
+
+    # Territory of each board, as rules.score_territories counts it:
+    # empty regions bordered by a single color belong to that color
+    def score_territories(self) -> tuple[np.ndarray, np.ndarray]:
+        empty = self.boards == EMPTY
+        reaches_black = flood(empty & any_neighbor(self.boards == BLACK), empty)
+        reaches_white = flood(empty & any_neighbor(self.boards == WHITE), empty)
+        white = (reaches_white & ~reaches_black).sum(axis=(1, 2))
+        black = (reaches_black & ~reaches_white).sum(axis=(1, 2))
+        return white.astype(float), black.astype(float)
+
+    # Area scores of each board: stones plus territory, komi for white
+    def area_scores(self, komi: float) -> tuple[np.ndarray, np.ndarray]:
+        white_territory, black_territory = self.score_territories()
+        white = (self.boards == WHITE).sum(axis=(1, 2)) + white_territory + komi
+        black = (self.boards == BLACK).sum(axis=(1, 2)) + black_territory
+        return white, black
+
+# The playable points of a board as an (N, N) int8 array, indexed [x, y]
+def board_to_array(board: Board) -> np.ndarray:
+    grid = np.frombuffer(bytes(board.points), dtype=np.int8).reshape(board.stride, board.stride)
+    return grid[1:-1, 1:-1].copy()
+
+# Points with at least one orthogonal neighbor in the mask
+def any_neighbor(mask: np.ndarray) -> np.ndarray:
+    result = np.zeros_like(mask)
+    result[:, 1:, :] |= mask[:, :-1, :]
+    result[:, :-1, :] |= mask[:, 1:, :]
+    result[:, :, 1:] |= mask[:, :, :-1]
+    result[:, :, :-1] |= mask[:, :, 1:]
+    return result
+
+# Points whose orthogonal neighbors are all in the mask or off the board
+def all_neighbors(mask: np.ndarray) -> np.ndarray:
+    result = np.ones_like(mask)
+    result[:, 1:, :] &= mask[:, :-1, :]
+    result[:, :-1, :] &= mask[:, 1:, :]
+    result[:, :, 1:] &= mask[:, :, :-1]
+    result[:, :, :-1] &= mask[:, :, 1:]
+    return result
+
+# Number of orthogonal neighbors of every point that are in the mask
+def count_neighbors(mask: np.ndarray) -> np.ndarray:
+    mask = mask.astype(np.int8)
+    result = np.zeros(mask.shape, dtype=np.int8)
+    result[:, 1:, :] += mask[:, :-1, :]
+    result[:, :-1, :] += mask[:, 1:, :]
+    result[:, :, 1:] += mask[:, :, :-1]
+    result[:, :, :-1] += mask[:, :, 1:]
+    return result
+
+# Grow the seed through connected points of the mask until it stops changing
+def flood(seed: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    filled = seed & mask
+    while True:
+        grown = (filled | any_neighbor(filled)) & mask
+        if np.array_equal(grown, filled):
+            return filled
+        filled = grown
+
+# Neighbor pairs of points as slices: the points and their neighbors in one direction
+NEIGHBOR_SLICES = (
+    (np.s_[:, 1:, :], np.s_[:, :-1, :]),
+    (np.s_[:, :-1, :], np.s_[:, 1:, :]),
+    (np.s_[:, :, 1:], np.s_[:, :, :-1]),
+    (np.s_[:, :, :-1], np.s_[:, :, 1:]),
+)
+
+# Label every point with the flat index, over the whole batch, of the lowest
+# point of its chain. Stones take the lowest label of their neighbors of the
+# same color, then jump to the label of the point theirs names, until nothing
+# changes. Empty points keep their own index. Only needed once: step keeps
+# the labels up to date as stones are played and captured
+def chain_labels(boards: np.ndarray) -> np.ndarray:
+    labels = np.arange(boards.size, dtype=np.int32).reshape(boards.shape)
+    joined = [(boards[point] != EMPTY) & (boards[point] == boards[neighbor]) for point, neighbor in NEIGHBOR_SLICES]
+    while True:
+        lowest = labels.copy()
+        for (point, neighbor), same in zip(NEIGHBOR_SLICES, joined):
+            np.copyto(lowest[point], np.minimum(lowest[point], labels[neighbor]), where=same)
+        lowest = lowest.ravel()[lowest]
+        if np.array_equal(lowest, labels):
+            return labels
+        labels = lowest
+
+# Stones whose chain has exactly one liberty: the lowest and the highest
+# liberty next to the chain are the same point
+def atari_stones(boards: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    empty = boards == EMPTY
+    points = boards[0].size
+    index = np.arange(points, dtype=np.int16).reshape(boards.shape[1:])
+    # Liberties as their index, points that aren't one as a value no index beats
+    low = np.where(empty, index, np.int16(points))
+    high = np.where(empty, index, np.int16(-1))
+    lowest = np.full(boards.shape, points, dtype=np.int16)
+    highest = np.full(boards.shape, -1, dtype=np.int16)
+    for point, neighbor in NEIGHBOR_SLICES:
+        np.minimum(lowest[point], low[neighbor], out=lowest[point])
+        np.maximum(highest[point], high[neighbor], out=highest[point])
+    # Empty points are labeled by their own index, so they never add to a chain
+    chain_lowest = np.full(boards.size, points, dtype=np.int16)
+    chain_highest = np.full(boards.size, -1, dtype=np.int16)
+    np.minimum.at(chain_lowest, labels.ravel(), lowest.ravel())
+    np.maximum.at(chain_highest, labels.ravel(), highest.ravel())
+    return ~empty & (chain_lowest[labels] == chain_highest[labels])
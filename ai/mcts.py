@@ -0,0 +1,185 @@
+import math
+import random
+import threading
+import time
+from go.types import Position, Color
+from go.board import Board, COLORS
+from go.game import Game
+from go import rules
+from ai.rollout import is_eye, play_out, rollout_move
+from ai.transposition import Entry, TranspositionTable, position_key
+
+PASS = Position(-1, -1)
+# Move of a root node whose previous move wasn't a pass
+ROOT = -1
+# Playouts of a ponder search: every playout adds a node to its tree,
+# this keeps the tree to a few tens of megabytes on a long opponent turn
+PONDER_PLAYOUTS = 50000
+
+# A node of the search tree: the position reached by playing its move
+# Its statistics live in the transposition table, shared with every
+# other node reaching the same position in this search or a previous one
+class Node:
+    __slots__ = ("move", "color", "parent", "children", "untried", "entry")
+    move: int | None # Index of the move that leads here, None for a pass
+    color: int # Color value of the player that made the move
+    parent: "Node | None"
+    children: list["Node"]
+    untried: list[int | None] | None # Moves not expanded yet, None until the node is first reached
+    entry: Entry # Visits and wins of the player that made the move
+
+    def __init__(self, move: int | None, color: int, parent: "Node | None", entry: Entry):
+        self.move = move
+        self.color = color
+        self.parent = parent
+        self.children = []
+        self.untried = None
+        self.entry = entry
+
+    # Check if the game is over at this node, after two passes in a row
+    def is_terminal(self) -> bool:
+        return self.move is None and self.parent is not None and self.parent.move is None
+
+# Monte Carlo Tree Search with UCT selection and random playouts.
+# The search stops after a number of playouts or a wall-clock budget,
+# whichever comes first (1000 playouts if neither is given).
+# Statistics are kept in a transposition table that outlives the search,
+# so the next turns of the game start from what was learned before
+class MCTS:
+    playouts: int | None
+    time_budget_ms: float | None
+    ponder_playouts: int # Playouts after which pondering stops on its own
+    exploration: float
+    table: TranspositionTable
+    last_playouts: int # Playouts run by the last search
+    last_playouts_per_s: float
+
+    def __init__(self, playouts: int | None = None, time_budget_ms: float | None = None,
+                 exploration: float = 1.4, table: TranspositionTable | None = None,
+                 ponder_playouts: int = PONDER_PLAYOUTS):
+        if playouts is None and time_budget_ms is None:
+            playouts = 1000
+        self.playouts = playouts
+        self.time_budget_ms = time_budget_ms
+        self.ponder_playouts = ponder_playouts
+        self.exploration = exploration
+        self.table = table if table is not None else TranspositionTable()
+        self.last_playouts = 0
+        self.last_playouts_per_s = 0.0
+
+    # Search from the position of the game and return the most visited move.
+    # Setting the stop event, or reaching the deadline (a time.perf_counter()
+    # value), ends the search early with the best move so far. If no playout
+    # got to finish, a quick random move is played rather than a pass
+    def search(self, game: Game, stop: threading.Event | None = None, deadline: float | None = None) -> Position:
+        if self.time_budget_ms is not None:
+            budget_deadline = time.perf_counter() + self.time_budget_ms / 1000
+            deadline = budget_deadline if deadline is None else min(deadline, budget_deadline)
+        board, root = self.run_search(game, stop, self.playouts, deadline)
+        best = max(root.children, key=lambda child: child.entry.visits, default=None)
+        if best is None or best.entry.visits == 0:
+            move = rollout_move(board, game.get_current_player().color.value)
+        else:
+            move = best.move
+        return PASS if move is None else board.position(move)
+
+    # Search from the position of the game until the stop event is set or
+    # ponder_playouts are run, with no time budget. Nothing is returned, what
+    # is learned stays in the table, so the search after the opponent's move
+    # starts from there
+    def ponder(self, game: Game, stop: threading.Event):
+        self.run_search(game, stop, self.ponder_playouts, None)
+
+    # Run playouts from the position of the game until the playout count, the
+    # deadline or the stop event is reached. Returns the board and the root
+    def run_search(self, game: Game, stop: threading.Event | None,
+                   max_playouts: int | None, deadline: float | None) -> tuple[Board, Node]:
+        # Playouts never estimate territory, so the copy doesn't keep the map
+        board = game.board.copy(territory=False)
+        player = game.get_current_player()
+        color = player.color.value
+        # Passing right after the opponent passed ends the game
+        opponent_player = game.black if player is game.white else game.white
+        move = None if opponent_player.passes > 0 else ROOT
+        root = Node(move, opponent(color), None, self.entry(board, opponent(color), move))
+        start = time.perf_counter()
+        playouts = 0
+        while max_playouts is None or playouts < max_playouts:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            if stop is not None and stop.is_set():
+                break
+            if self.run_playout(board, root, game.komi, deadline):
+                playouts += 1
+        elapsed = time.perf_counter() - start
+        self.last_playouts = playouts
+        self.last_playouts_per_s = playouts / elapsed if elapsed > 0 else 0.0
+        return board, root
+
+    # Select, expand, play out and back the result up, leaving the board as it was.
+    # A playout cut short by the deadline isn't backed up, the game it leaves
+    # unfinished says nothing about the winner. Returns whether it was backed up
+    def run_playout(self, board: Board, root: Node, komi: float, deadline: float | None = None) -> bool:
+        depth = len(board.undo_stack)
+        node = root
+        # Selection
+        while node.untried is not None and not node.untried and node.children:
+            node = self.select_child(node)
+            if node.move is not None:
+                board.play_at(node.move, node.color)
+        # Expansion
+        finished = True
+        if not node.is_terminal():
+            if node.untried is None:
+                node.untried = self.candidate_moves(board, opponent(node.color)) or [None]
+            if node.untried:
+                move = node.untried.pop(random.randrange(len(node.untried)))
+                color = opponent(node.color)
+                if move is not None:
+                    board.play_at(move, color)
+                child = Node(move, color, node, self.entry(board, color, move))
+                node.children.append(child)
+                node = child
+            # Simulation
+            finished = play_out(board, opponent(node.color), 1 if node.move is None else 0, deadline=deadline)
+        # Backpropagation
+        if finished:
+            winner = self.winner(board, komi)
+            while node is not None:
+                node.entry.visits += 1
+                if node.color == winner:
+                    node.entry.wins += 1
+                node = node.parent
+        while len(board.undo_stack) > depth:
+            board.undo()
+        return finished
+
+    # Statistics of the position on the board, reached by a move of the given color
+    def entry(self, board: Board, color: int, move: int | None) -> Entry:
+        return self.table.get(position_key(board.hash, color, move is None))
+
+    # Pick the child with the best upper confidence bound
+    def select_child(self, node: Node) -> Node:
+        log_visits = math.log(max(node.entry.visits, 1))
+        def uct(child: Node) -> float:
+            entry = child.entry
+            if entry.visits == 0:
+                return math.inf
+            return entry.wins / entry.visits + self.exploration * math.sqrt(log_visits / entry.visits)
+        return max(node.children, key=uct)
+
+    # Every legal move that doesn't fill an own eye
+    def candidate_moves(self, board: Board, color: int) -> list[int]:
+        return [index for index in board.empty
+                if not is_eye(board, index, color)
+                and rules.is_legal_at(board, index, COLORS[color])]
+
+    # Color value of the winner by area scoring: stones plus territory
+    def winner(self, board: Board, komi: float) -> int:
+        white_territory, black_territory = rules.score_territories(board)
+        white = board.points.count(Color.WHITE.value) + white_territory + komi
+        black = board.points.count(Color.BLACK.value) + black_territory
+        return Color.WHITE.value if white > black else Color.BLACK.value
+
+def opponent(color: int) -> int:
+    return Color.WHITE.value if color == Color.BLACK.value else Color.BLACK.value
@@ -0,0 +1,71 @@
+import random
+import time
+from go.board import Board, COLORS
+from go.types import Color
+from go import rules
+
+# Light playout policy: random moves that don't fill own eyes, drawn from
+# the list of empty points the board keeps up to date
+SAMPLE_TRIES = 8 # Random empty points tried before walking the list
+
+# Check if an empty point is an eye of the given color: all its neighbors
+# are stones of that color, and the opponent doesn't hold enough of the
+# diagonals to make it false (two in the center, one on the edge)
+def is_eye(board: Board, index: int, color: int) -> bool:
+    points = board.points
+    for neighbor in board.neighbors[index]:
+        if points[neighbor] != color:
+            return False
+    diagonals = board.diagonals[index]
+    enemy_diagonals = 0
+    for diagonal in diagonals:
+        value = points[diagonal]
+        if value != color and value != Color.EMPTY.value:
+            enemy_diagonals += 1
+    on_edge = 1 if len(diagonals) < 4 else 0
+    return enemy_diagonals + on_edge < 2
+
+# Pick a random legal move that doesn't fill an own eye, None to pass.
+# Random empty points are tried first: while most of them are playable this
+# is uniform and takes constant time. If they all fail, the empty points
+# are walked from a random start, which favors the points right after a
+# run of unplayable ones but always finds a move if there is one
+def rollout_move(board: Board, color: int) -> int | None:
+    empty = board.empty
+    count = len(empty)
+    if count == 0:
+        return None
+    color_enum = COLORS[color]
+    for _ in range(SAMPLE_TRIES):
+        index = empty[random.randrange(count)]
+        if not is_eye(board, index, color) and rules.is_legal_at(board, index, color_enum):
+            return index
+    start = random.randrange(count)
+    for i in range(start, start + count):
+        index = empty[i % count]
+        if not is_eye(board, index, color) and rules.is_legal_at(board, index, color_enum):
+            return index
+    return None
+
+# Play rollout moves until both players pass or the move cap is reached.
+# passes is the number of passes right before the playout starts.
+# Returns False if the deadline (a time.perf_counter() value) came first,
+# leaving the game unfinished
+def play_out(board: Board, color: int, passes: int = 0, max_moves: int | None = None,
+             deadline: float | None = None) -> bool:
+    if max_moves is None:
+        max_moves = board.size * board.size * 2
+    opponent = {Color.BLACK.value: Color.WHITE.value, Color.WHITE.value: Color.BLACK.value}
+    moves = 0
+    while passes < 2 and moves < max_moves:
+        if deadline is not None and time.perf_counter() >= deadline:
+            return False
+        move = rollout_move(board, color)
+        if move is None:
+            passes += 1
+        else:
+            passes = 0
+            board.play_at(move, color)
+        color = opponent[color]
+        moves += 1
+    return True
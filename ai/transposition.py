@@ -0,0 +1,66 @@
+import random
+from collections import OrderedDict
+
+# Rough memory taken by one entry: the dictionary slot, the key and the Entry
+ENTRY_BYTES = 200
+
+# Keys mixed into a board hash so the same stones with a different player
+# to move, or right after a pass, are different positions for the search
+_rng = random.Random("transposition")
+SIDE_KEYS = (0, _rng.getrandbits(64), _rng.getrandbits(64))
+PASS_KEY = _rng.getrandbits(64)
+
+# Search statistics of a position
+class Entry:
+    __slots__ = ("visits", "wins")
+    visits: int
+    wins: int # Playouts won by the player that moved into the position
+
+    def __init__(self):
+        self.visits = 0
+        self.wins = 0
+
+# Bounded table of search statistics keyed by position hash.
+# When full, the least recently used entry is dropped
+class TranspositionTable:
+    max_entries: int
+    entries: OrderedDict[int, Entry]
+    hits: int
+    misses: int
+
+    def __init__(self, max_megabytes: float = 32, max_entries: int | None = None):
+        if max_entries is None:
+            max_entries = int(max_megabytes * 2**20 / ENTRY_BYTES)
+        self.max_entries = max(1, max_entries)
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    # Get the entry of a key, adding an empty one if it isn't there
+    def get(self, key: int) -> Entry:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        entry = Entry()
+        self.entries[key] = entry
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+# Key of a position: the board hash, who made the last move and whether it was a pass
+def position_key(board_hash: int, color: int, passed: bool) -> int:
+    key = board_hash ^ SIDE_KEYS[color]
+    if passed:
+        key ^= PASS_KEY
+    return key
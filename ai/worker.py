@@ -0,0 +1,80 @@
+import threading
+from go.types import Position
+from go.game import Game
+from ai.ai_player import AIPlayer
+
+# A decision being computed in the background
+class AIJob:
+    tag: object # Whatever the caller uses to recognize the job, e.g. the turn
+    stop: threading.Event # Asks the search to return its best move so far
+    done: threading.Event
+    move: Position | None
+    error: BaseException | None # Raised by the decision instead of returning a move
+
+    def __init__(self, tag: object):
+        self.tag = tag
+        self.stop = threading.Event()
+        self.done = threading.Event()
+        self.move = None
+        self.error = None
+
+# Runs AIPlayer.decide_move on a thread against a snapshot of the game,
+# so the frame loop keeps rendering and handling input meanwhile.
+# The loop polls for the move with take_result()
+class AIWorker:
+    job: AIJob | None
+    timer: threading.Timer | None
+
+    def __init__(self):
+        self.job = None
+        self.timer = None
+
+    # Check if there is no decision running nor waiting to be taken
+    @property
+    def idle(self) -> bool:
+        return self.job is None
+
+    # Start deciding the move of a player. After time_limit_ms the search
+    # is asked to stop and return the best move found so far
+    def start(self, player: AIPlayer, game: Game, tag: object = None, time_limit_ms: float | None = None):
+        self.cancel()
+        job = AIJob(tag)
+        snapshot = game.snapshot()
+        # The job is done even if the decision fails, the error is raised by take_result
+        def think():
+            try:
+                job.move = player.decide_move(snapshot, job.stop)
+            except BaseException as error:
+                job.error = error
+            finally:
+                job.done.set()
+        self.job = job
+        threading.Thread(target=think, name="ai-worker", daemon=True).start()
+        if time_limit_ms is not None:
+            self.timer = threading.Timer(time_limit_ms / 1000, job.stop.set)
+            self.timer.daemon = True
+            self.timer.start()
+
+    # Get the decided move and its tag once it's ready, None meanwhile.
+    # If the decision failed, its error is raised here, on the caller's thread
+    def take_result(self) -> tuple[Position, object] | None:
+        if self.job is None or not self.job.done.is_set():
+            return None
+        job = self.job
+        self.job = None
+        self.stop_timer()
+        if job.error is not None:
+            raise job.error
+        return job.move, job.tag
+
+    # Drop the running decision, its thread ends as soon as the search stops
+    def cancel(self):
+        if self.job is not None:
+            self.job.stop.set()
+            self.job = None
+        self.stop_timer()
+
+    def stop_timer(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
@@ -0,0 +1,227 @@
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+from typing import Callable
+from go.types import Color, Position
+from go.board import Board
+from go import rules
+
+BATCH_PLAYOUTS = 256 # Playouts run together by the batch case
+
+# Benchmarks of the rules engine on fixed, seeded random games:
+# python benchmark.py --sizes 9 13 19 --save baseline.json
+# python benchmark.py --compare baseline.json
+# python benchmark.py --batch  (adds the NumPy batch playouts, ai/batch.py)
+# Each case is timed a few times and the best run is kept. Memory is
+# measured on a separate run with tracemalloc, which slows the code down.
+# A case regresses when it gets slower, or its peak memory grows, by more
+# than the tolerance
+
+@dataclass
+class BenchmarkResult:
+    name: str # Benchmarked function and board size, e.g. "execute_move 9x9"
+    ops: int # Operations in one run
+    seconds: float # Best time of a run
+    ops_per_s: float
+    peak_kib: float # Peak memory allocated during a run, above what was allocated before it
+    retained_blocks_per_op: float # Memory blocks still alive after the run, per operation
+
+# A benchmark case: setup runs untimed and returns the work to time,
+# which returns the number of operations it did
+@dataclass
+class Case:
+    name: str
+    setup: Callable[[], Callable[[], int]]
+
+# Moves of a random game: random legal points until both players pass or
+# the move cap is reached. The same seed always gives the same game
+def random_game(size: int, seed: int, max_moves: int | None = None) -> list[tuple[Position, Color]]:
+    if max_moves is None:
+        max_moves = size * size * 2
+    rng = random.Random(seed)
+    board = Board(size)
+    color = Color.BLACK
+    moves = []
+    passes = 0
+    while passes < 2 and len(moves) < max_moves:
+        candidates = [board.position(index) for index in board.empty]
+        rng.shuffle(candidates)
+        move = next((pos for pos in candidates if rules.is_move_legal(board, pos, color)), None)
+        if move is None:
+            passes += 1
+        else:
+            passes = 0
+            rules.execute_move(board, move, color)
+            moves.append((move, color))
+        color = Color.WHITE if color == Color.BLACK else Color.BLACK
+    return moves
+
+# Boards at evenly spaced points of a game, from the opening to the end
+def checkpoints(size: int, moves: list[tuple[Position, Color]], count: int = 8) -> list[Board]:
+    board = Board(size)
+    boards = []
+    for i, (pos, color) in enumerate(moves, 1):
+        rules.execute_move(board, pos, color)
+        if i % max(len(moves) // count, 1) == 0:
+            boards.append(board.copy())
+    return boards
+
+def make_cases(size: int, seed: int, batch: bool = False) -> list[Case]:
+    label = f"{size}x{size}"
+    def execute_move() -> Callable[[], int]:
+        moves = random_game(size, seed)
+        def run() -> int:
+            board = Board(size)
+            for pos, color in moves:
+                rules.execute_move(board, pos, color)
+            return len(moves)
+        return run
+    def is_move_legal() -> Callable[[], int]:
+        boards = checkpoints(size, random_game(size, seed))
+        points = [Position(x, y) for x in range(size) for y in range(size)]
+        def run() -> int:
+            for board in boards:
+                for pos in points:
+                    rules.is_move_legal(board, pos, Color.BLACK)
+                    rules.is_move_legal(board, pos, Color.WHITE)
+            return len(boards) * len(points) * 2
+        return run
+    def find_all_groups() -> Callable[[], int]:
+        boards = checkpoints(size, random_game(size, seed))
+        def run() -> int:
+            for board in boards:
+                rules.find_all_groups(board, Color.BLACK)
+                rules.find_all_groups(board, Color.WHITE)
+            return len(boards) * 2
+        return run
+    def score_territories() -> Callable[[], int]:
+        boards = checkpoints(size, random_game(size, seed))
+        def run() -> int:
+            for board in boards:
+                rules.score_territories(board)
+            return len(boards)
+        return run
+    def full_game() -> Callable[[], int]:
+        def run() -> int:
+            random_game(size, seed)
+            return 1
+        return run
+    # Random playouts from the empty board, all advanced at once with NumPy.
+    # Imported here so the other cases run without NumPy
+    def batch_playouts() -> Callable[[], int]:
+        from ai.batch import BatchPlayouts
+        def run() -> int:
+            playouts = BatchPlayouts.from_board(Board(size), Color.BLACK, BATCH_PLAYOUTS, seed)
+            playouts.run()
+            playouts.area_scores(6.5)
+            return BATCH_PLAYOUTS
+        return run
+    cases = [
+        Case(f"execute_move {label}", execute_move),
+        Case(f"is_move_legal {label}", is_move_legal),
+        Case(f"find_all_groups {label}", find_all_groups),
+        Case(f"score_territories {label}", score_territories),
+        Case(f"random_game {label}", full_game),
+    ]
+    if batch:
+        cases.append(Case(f"batch_playouts {label}", batch_playouts))
+    return cases
+
+def run_case(case: Case, repeat: int, memory: bool) -> BenchmarkResult:
+    work = case.setup()
+    best = float("inf")
+    ops = 0
+    # Like timeit, keep the garbage collector from running in the middle of a run
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            ops = work()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    peak_kib = 0.0
+    retained_blocks_per_op = 0.0
+    if memory:
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        start_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        work()
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+        peak_kib = (peak - start_bytes) / 1024
+        retained_blocks_per_op = blocks / ops
+    return BenchmarkResult(case.name, ops, best, ops / best, peak_kib, retained_blocks_per_op)
+
+# Print the results, next to the baseline ones if given. Returns the names
+# of the cases that got slower than the baseline, or whose peak memory grew,
+# by more than the tolerance. Memory is only compared when both measured it
+def report(results: list[BenchmarkResult], baseline: dict[str, dict] | None, tolerance: float) -> list[str]:
+    regressions = []
+    for result in results:
+        line = (f"{result.name:<26} {result.ops_per_s:>12.1f} ops/s  "
+                f"peak {result.peak_kib:>8.1f} KiB  {result.retained_blocks_per_op:>6.2f} retained blocks/op")
+        reference = baseline.get(result.name) if baseline is not None else None
+        if reference is not None:
+            ratio = result.ops_per_s / reference["ops_per_s"]
+            line += f"  {ratio:>6.2f}x baseline"
+            regressed = ratio < 1 - tolerance
+            if result.peak_kib > 0 and reference["peak_kib"] > 0:
+                memory_ratio = result.peak_kib / reference["peak_kib"]
+                line += f"  {memory_ratio:>6.2f}x peak"
+                regressed |= memory_ratio > 1 + tolerance
+            if regressed:
+                line += "  REGRESSION"
+                regressions.append(result.name)
+        print(line)
+    return regressions
+
+def parse_args(args: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks of the rules engine")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[9, 13, 19], help="board sizes")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random games")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case, the best one is kept")
+    parser.add_argument("--no-memory", action="store_true", help="skip the memory measurements")
+    parser.add_argument("--batch", action="store_true", help="also run the NumPy batch playouts (needs NumPy)")
+    parser.add_argument("--only", default=None, help="run only the cases whose name contains this text")
+    parser.add_argument("--save", default=None, help="write the results to a baseline JSON file")
+    parser.add_argument("--compare", default=None, help="compare against a baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="slowdown, or growth of peak memory, allowed before a case counts as a regression")
+    return parser.parse_args(args)
+
+def main(args: list[str] | None = None) -> int:
+    args = parse_args(args)
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+    results = []
+    for size in args.sizes:
+        for case in make_cases(size, args.seed, args.batch):
+            if args.only is None or args.only in case.name:
+                results.append(run_case(case, args.repeat, not args.no_memory))
+    regressions = report(results, baseline, args.tolerance)
+    if args.save is not None:
+        with open(args.save, "w") as file:
+            json.dump({
+                "python": sys.version.split()[0],
+                "seed": args.seed,
+                "results": {result.name: asdict(result) for result in results},
+            }, file, indent=2)
+        print(f"saved to {args.save}")
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
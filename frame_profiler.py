@@ -0,0 +1,141 @@
+import time
+from collections import Counter, deque
+from contextlib import nullcontext
+import pygame
+
+# Phases of a frame, in the order they are shown.
+# compose and render happen inside blit, and are not counted twice
+PHASES = ("input", "update", "ai", "compose", "render", "blit", "flip")
+HISTORY_FRAMES = 120 # Frames averaged by the overlay
+
+# Timings of one frame, in milliseconds
+class FrameRecord:
+    __slots__ = ("number", "total_ms", "phases", "composes")
+    number: int
+    total_ms: float
+    phases: dict[str, float] # Time spent in each phase, without its nested phases
+    composes: Counter[str] # Calls to compose() by UIElement class
+
+    def __init__(self, number: int):
+        self.number = number
+        self.total_ms = 0.0
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.composes = Counter()
+
+# Measures one phase, leaving out the time of the phases nested inside it
+class Span:
+    __slots__ = ("profiler", "phase", "start")
+
+    def __init__(self, profiler: "FrameProfiler", phase: str):
+        self.profiler = profiler
+        self.phase = phase
+
+    def __enter__(self):
+        self.profiler.nested.append(0.0)
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        elapsed = (time.perf_counter() - self.start) * 1000
+        nested = self.profiler.nested
+        inner = nested.pop()
+        self.profiler.record.phases[self.phase] += elapsed - inner
+        if nested:
+            nested[-1] += elapsed
+        return False
+
+# Opt-in instrumentation of the frame loop. The manager wraps each phase
+# with span(), UIElement.render does the same for compose and render.
+# Recent frames are averaged on an overlay, and every frame can be
+# written to a CSV file as it ends
+class FrameProfiler:
+    record: FrameRecord # Frame being measured
+    history: deque[FrameRecord]
+    nested: list[float] # Time of the nested phases of each open span
+    show_overlay: bool
+
+    def __init__(self, dump_path: str | None = None, history: int = HISTORY_FRAMES):
+        self.record = FrameRecord(0)
+        self.history = deque(maxlen=history)
+        self.nested = []
+        self.show_overlay = True
+        self.frame_start = time.perf_counter()
+        self.font = None
+        self.dump_file = None
+        if dump_path is not None:
+            self.dump_file = open(dump_path, "w")
+            self.dump_file.write(",".join(("frame", "total_ms", *PHASES, "composes")) + "\n")
+
+    def begin_frame(self):
+        self.record = FrameRecord(self.record.number + 1)
+        self.nested.clear()
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        record = self.record
+        record.total_ms = (time.perf_counter() - self.frame_start) * 1000
+        self.history.append(record)
+        if self.dump_file is not None:
+            composes = ";".join(f"{name}:{count}" for name, count in record.composes.most_common())
+            timings = (f"{record.phases[phase]:.3f}" for phase in PHASES)
+            self.dump_file.write(",".join((str(record.number), f"{record.total_ms:.3f}", *timings, composes)) + "\n")
+
+    def count_compose(self, element: object):
+        self.record.composes[type(element).__name__] += 1
+
+    # Averages over the recent frames, drawn on the top left corner.
+    # Returns the area it covers, None if it isn't shown
+    def draw_overlay(self, destination: pygame.surface.Surface) -> pygame.Rect | None:
+        if not self.show_overlay or not self.history:
+            return None
+        if self.font is None:
+            self.font = pygame.font.SysFont("monospace", 16)
+        frames = len(self.history)
+        total = sum(record.total_ms for record in self.history) / frames
+        worst = max(record.total_ms for record in self.history)
+        lines = [f"frame {total:6.2f}ms avg {worst:6.2f}ms max {1000 / total if total else 0:5.0f} fps"]
+        for phase in PHASES:
+            average = sum(record.phases[phase] for record in self.history) / frames
+            lines.append(f"{phase:<8}{average:6.2f}ms")
+        composes = Counter()
+        for record in self.history:
+            composes.update(record.composes)
+        for name, count in composes.most_common(5):
+            lines.append(f"{name:<16}{count / frames:5.1f} composes/frame")
+        rendered = [self.font.render(line, True, pygame.Color("white")) for line in lines]
+        width = max(surface.get_width() for surface in rendered) + 8
+        height = sum(surface.get_height() for surface in rendered) + 8
+        background = pygame.surface.Surface((width, height), pygame.SRCALPHA)
+        background.fill((0, 0, 0, 180))
+        destination.blit(background, (0, 0))
+        y = 4
+        for surface in rendered:
+            destination.blit(surface, (4, y))
+            y += surface.get_height()
+        return pygame.Rect(0, 0, width, height)
+
+    def close(self):
+        if self.dump_file is not None:
+            self.dump_file.close()
+            self.dump_file = None
+
+# Profiler of the running game, None unless profiling was asked for
+active: FrameProfiler | None = None
+
+def start(dump_path: str | None = None) -> FrameProfiler:
+    global active
+    active = FrameProfiler(dump_path)
+    return active
+
+def stop():
+    global active
+    if active is not None:
+        active.close()
+    active = None
+
+_no_span = nullcontext()
+
+# Context manager timing a phase of the current frame, or doing nothing when not profiling
+def span(phase: str) -> Span | nullcontext:
+    if active is None:
+        return _no_span
+    return Span(active, phase)
@@ -4,11 +4,18 @@ from go.types import Color, Position
 from go.player import Player
 from go.game import Game
 from ui.views.game_view import GameView
-from ai.ai_player import AIPlayer
+from ai.ai_player import AIPlayer, MAX_THINKING_MS
+from ai.worker import AIWorker
+from ai.mcts import MCTS
 from sound_manager import SoundManager
+import frame_profiler
+
+MAX_DIRTY_RECTS = 32 # Above this, the dirty areas are merged into one
 
 class GameManager:
-    def __init__(self):
+    # With profile, frame timings are shown on an overlay (toggled with F3)
+    # and, if profile_dump is a path, written there as CSV
+    def __init__(self, profile: bool = False, profile_dump: str | None = None):
         pygame.init()
         self.window = pygame.display.set_mode((WIDTH, HEIGHT))
         self.clock = pygame.time.Clock()
@@ -18,51 +25,124 @@ class GameManager:
         self.size = 9
         self.komi = 6.5
         self.as_white = False
+        self.ai_search = False # Use MCTS instead of the heuristic strategies
+        self.ai_ponder = False # Let the search run during the player's turn
 
         self.sound_manager = SoundManager()
         self.sound_manager.load_all_sounds()
         
         # Create game and view
         self.game = None
+        self.ai_player = None
+        self.ai_worker = AIWorker()
         self.view = GameView(self.start_game, self.start_ai_game)
+        self.full_redraw = True # Draw the whole window on the next frame
+        self.overlay_rect = None
+        if profile or profile_dump is not None:
+            frame_profiler.start(profile_dump)
     
     def run(self):
         # Main game loop
         while self.running:
             delta_time = self.clock.tick() # In miliseconds
+            profiler = frame_profiler.active
+            if profiler is not None:
+                profiler.begin_frame()
             
             # Handle input
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    self.view.handle_click(event.pos)
+            with frame_profiler.span("input"):
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        self.running = False
+                    elif event.type == pygame.WINDOWEXPOSED:
+                        self.full_redraw = True
+                    elif event.type == pygame.MOUSEBUTTONDOWN:
+                        self.view.handle_click(event.pos)
+                    elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3 and profiler is not None:
+                        profiler.show_overlay = not profiler.show_overlay
             
             # Update
-            self.view.update(delta_time)
+            with frame_profiler.span("update"):
+                self.view.update(delta_time)
             
-            # AI turn handling
-            if self.game is not None and isinstance(self.game.get_current_player(), AIPlayer):
-                ai_player = self.game.get_current_player()
-                if not ai_player.thinking:
-                    ai_player.thinking = True
-                    ai_player.thinking_elapsed_ms = 0
-                
-                if ai_player.finished_thinking(delta_time):
-                    move = ai_player.decide_move(self.game)
-                    assert move is not None, "wtff"
-                    if move != Position(-1, -1):
-                        self.game.move_to(move)
-                    else:
-                        self.game.pass_turn()
-            # Draw
-            self.window.fill("black")
-            self.view.draw_on(self.window)
-            pygame.display.flip()
+            with frame_profiler.span("ai"):
+                self.update_ai(delta_time)
+            # Draw only the areas that changed
+            with frame_profiler.span("blit"):
+                rects = self.draw()
+            if profiler is not None:
+                overlay_rect = profiler.draw_overlay(self.window)
+                if overlay_rect is not None:
+                    rects.append(overlay_rect)
+                    self.overlay_rect = overlay_rect
+            with frame_profiler.span("flip"):
+                if rects:
+                    pygame.display.update(rects)
+            if profiler is not None:
+                profiler.end_frame()
         
+        self.stop_ai()
+        frame_profiler.stop()
         pygame.quit()
 
+    # Draw the dirty areas of the view on the window and return them.
+    # The view is rendered first, which gives the areas it changed
+    def draw(self) -> list[pygame.Rect]:
+        self.view.render()
+        rects = self.view.take_changes()
+        window_rect = self.window.get_rect()
+        if self.full_redraw:
+            rects = [window_rect]
+            self.full_redraw = False
+        # The overlay of the profiler is drawn over the view every frame
+        if self.overlay_rect is not None:
+            rects.append(self.overlay_rect)
+            self.overlay_rect = None
+        # Many small areas are cheaper to draw as a single one
+        if len(rects) > MAX_DIRTY_RECTS:
+            rects = [rects[0].unionall(rects[1:])]
+        rects = [clipped for rect in rects if (clipped := rect.clip(window_rect))]
+        for rect in rects:
+            self.window.set_clip(rect)
+            self.window.fill("black")
+            self.view.draw_on(self.window)
+        self.window.set_clip(None)
+        return rects
+
+    def update_ai(self, delta_time: float):
+        # AI turn handling, the move is decided on a worker thread
+        if self.game is not None and isinstance(self.game.get_current_player(), AIPlayer):
+            ai_player = self.game.get_current_player()
+            if self.ai_worker.idle:
+                ai_player.thinking = True
+                ai_player.thinking_elapsed_ms = 0
+                self.ai_worker.start(ai_player, self.game, (self.game, self.game.turn), MAX_THINKING_MS)
+            elif ai_player.thinking:
+                ai_player.finished_thinking(delta_time)
+            # Take the move once it's ready and the thinking time is over,
+            # unless the game moved on while it was being decided
+            result = None if ai_player.thinking else self.ai_worker.take_result()
+            if result is not None and result[1] == (self.game, self.game.turn):
+                move = result[0]
+                assert move is not None, "wtff"
+                if move != Position(-1, -1):
+                    self.game.move_to(move)
+                else:
+                    self.game.pass_turn()
+        # Pondering during the player's turn, until both passed and scoring started
+        elif self.ai_player is not None and not self.game.is_finished \
+                and (self.game.white.passes == 0 or self.game.black.passes == 0):
+            self.ai_player.start_pondering(self.game)
+
+    # Stop every background search of the current game
+    def stop_ai(self):
+        self.ai_worker.cancel()
+        if self.ai_player is not None:
+            self.ai_player.stop_pondering()
+            self.ai_player = None
+
     def start_game(self) -> Game:
+        self.stop_ai()
         self.game = Game(self.size, self.komi)
         self.game.white = Player(Color.WHITE)
         self.game.black = Player(Color.BLACK)
@@ -76,20 +156,26 @@ class GameManager:
         return self.game
 
     def start_ai_game(self) -> Game:
+        self.stop_ai()
         self.game = Game(self.size, self.komi)
         if self.as_white:
             self.game.white = Player(Color.WHITE)
             self.game.white.main = True
-            ai_player = AIPlayer(Color.BLACK)
+            ai_player = self.create_ai_player(Color.BLACK)
             self.game.black = ai_player
             self.game.add_listener(ai_player)
         else:
             self.game.black = Player(Color.BLACK)
             self.game.black.main = True
-            ai_player = AIPlayer(Color.WHITE)
+            ai_player = self.create_ai_player(Color.WHITE)
             self.game.white = ai_player
             self.game.add_listener(ai_player)
         
         self.game.add_listener(self.sound_manager)
+        self.ai_player = ai_player
+
+        return self.game
 
-        return self.game
\ No newline at end of file
+    def create_ai_player(self, color: Color) -> AIPlayer:
+        mcts = MCTS() if self.ai_search else None
+        return AIPlayer(color, mcts, self.ai_ponder)
@@ -1,18 +1,183 @@
-from go.types import Position, Group, Color, ORTHOGONAL_DIRECTIONS
+import random
+from functools import lru_cache
+from typing import Iterable, Iterator
+from go.types import Position, Group, Color, ORTHOGONAL_DIRECTIONS, DIAGONAL_DIRECTIONS
+from go.territory import TerritoryMap
 
+# Value stored on the frame that surrounds the playable points
+BORDER = 3
+# Colors indexed by the value stored on the board
+COLORS = (Color.EMPTY, Color.BLACK, Color.WHITE)
+
+# Random 64-bit keys for every (color value, index) of a board size.
+# They are generated from a fixed seed, so hashes are stable between runs
+@lru_cache(maxsize=None)
+def zobrist_keys(size: int) -> tuple[tuple[int, ...], ...]:
+    rng = random.Random(size)
+    length = (size + 2) ** 2
+    empty = (0,) * length
+    black = tuple(rng.getrandbits(64) for _ in range(length))
+    white = tuple(rng.getrandbits(64) for _ in range(length))
+    return (empty, black, white)
+
+# Orthogonal neighbors of every index of a board size, shared by every
+# board of that size. Each entry holds the indices of the neighbors on the
+# board, in the order of ORTHOGONAL_DIRECTIONS, and the frame has none
+@lru_cache(maxsize=None)
+def neighbor_table(size: int) -> tuple[tuple[int, ...], ...]:
+    return _adjacency_table(size, ORTHOGONAL_DIRECTIONS)
+
+# Same as neighbor_table, for the diagonal neighbors
+@lru_cache(maxsize=None)
+def diagonal_table(size: int) -> tuple[tuple[int, ...], ...]:
+    return _adjacency_table(size, DIAGONAL_DIRECTIONS)
+
+def _adjacency_table(size: int, directions: list[Position]) -> tuple[tuple[int, ...], ...]:
+    stride = size + 2
+    def on_board(index: int) -> bool:
+        x, y = divmod(index, stride)
+        return 1 <= x <= size and 1 <= y <= size
+    offsets = tuple(d.x * stride + d.y for d in directions)
+    return tuple(tuple(index + offset for offset in offsets if on_board(index + offset))
+                 if on_board(index) else ()
+                 for index in range(stride * stride))
+
+# Position of every index of a board size, frame included
+@lru_cache(maxsize=None)
+def position_table(size: int) -> tuple[Position, ...]:
+    stride = size + 2
+    return tuple(Position(x - 1, y - 1) for x in range(stride) for y in range(stride))
+
+# A connected set of stones of the same color, along with its liberties.
+# Stones and liberties are indices in the flat array of the board
+class Chain:
+    __slots__ = ("color", "stones", "liberties", "bucket")
+    color: int # Color value of the stones
+    stones: set[int]
+    liberties: set[int]
+    bucket: int # Liberty bucket of the board holding the chain, -1 if none
+
+    def __init__(self, color: int, stones: set[int], liberties: set[int]):
+        self.color = color
+        self.stones = stones
+        self.bucket = -1
+        self.liberties = liberties
+
+    def __repr__(self):
+        return f"Chain({COLORS[self.color]}, {len(self.stones)} stones, {len(self.liberties)} liberties)"
+
+# Everything needed to take back a move played with Board.play
+class UndoRecord:
+    __slots__ = ("index", "color", "merged", "liberties", "captured", "hash", "logged")
+    index: int # Where the stone was placed
+    color: int # Color value of the placed stone
+    merged: list[Chain] # Chains absorbed into a larger one by the stone
+    liberties: set[int] | None # Liberties of the larger chain before the merge, None if the stone started a chain
+    captured: list[Chain] # Chains removed by the move, including the own chain on suicide
+    hash: int # Hash of the position before the move
+    logged: bool # Whether the move added the resulting position to the history
+
+    def __init__(self, index: int, color: int, hash: int):
+        self.index = index
+        self.color = color
+        self.merged = []
+        self.liberties = None
+        self.captured = []
+        self.hash = hash
+        self.logged = False
+
+    def __repr__(self):
+        return f"UndoRecord({self.index}, {COLORS[self.color]}, {len(self.captured)} captured)"
+
+# The board is a flat bytearray with a one point wide BORDER frame.
+# Neighbors are looked up in tables precomputed once per board size
 class Board:
     size: int # 9x9, 13x13, 19x19
-    map: list[list[Color]] # 2D list of Colors representing the state of the board
-    various_positions: list[tuple[tuple[Color, ...], ...]] # Log of previous states
-    white_groups: list[Group] # List of present white connected groups
-    black_groups: list[Group] # List of present black connected groups
+    stride: int # Length of a padded row (size + 2)
+    points: bytearray # Flat array of Color values, framed by BORDER
+    neighbors: tuple[tuple[int, ...], ...] # Shared neighbor_table of the size
+    diagonals: tuple[tuple[int, ...], ...] # Shared diagonal_table of the size
+    positions: tuple[Position, ...] # Shared position_table of the size
+    keys: tuple[tuple[int, ...], ...] # Zobrist keys by color value and index
+    hash: int # Zobrist hash of the current position
+    history: set[int] # Hashes of the logged positions
+    verify_history: bool # Compare full positions when a hash is found in the history
+    logged_positions: dict[int, bytes] # Logged positions by hash, only kept when verifying
+    chain_of: list[Chain | None] # Chain of the stone at each index
+    chains: dict[int, dict[Chain, None]] # Present chains of each color value, in insertion order
+    liberty_buckets: dict[int, dict[int, dict[Chain, None]]] # Chains of each color value by liberty count
+    undo_stack: list[UndoRecord] # Moves played with play(), most recent last
+    empty: list[int] # Indices of the empty points, in no particular order
+    empty_slot: list[int] # Slot of each index in empty, -1 if it holds a stone
+    territory: TerritoryMap | None # Built by the first territory estimate
+    changed_points: list[int] | None # Points changed since the territory was updated, None without one
 
-    def __init__(self, size: int):
+    def __init__(self, size: int, verify_history: bool = False):
         self.size = size
-        self.map = [[Color.EMPTY for _ in range(self.size)] for _ in range(self.size)]
-        self.various_positions = []
-        self.white_groups = []
-        self.black_groups = []
+        self.stride = size + 2
+        self.points = bytearray([BORDER]) * (self.stride * self.stride)
+        for x in range(size):
+            start = self.index_xy(x, 0)
+            self.points[start:start + size] = bytes(size)
+        self.neighbors = neighbor_table(size)
+        self.diagonals = diagonal_table(size)
+        self.positions = position_table(size)
+        self.keys = zobrist_keys(size)
+        self.hash = 0
+        self.history = set()
+        self.verify_history = verify_history
+        self.logged_positions = {}
+        self.chain_of = [None] * len(self.points)
+        self.chains = {Color.BLACK.value: {}, Color.WHITE.value: {}}
+        self.liberty_buckets = {Color.BLACK.value: {}, Color.WHITE.value: {}}
+        self.undo_stack = []
+        self.empty = list(self.indices())
+        self.empty_slot = [-1] * len(self.points)
+        for slot, index in enumerate(self.empty):
+            self.empty_slot[index] = slot
+        self.territory = None
+        self.changed_points = None
+
+    # Copy of the position, its history and its territory map, without the undo stack.
+    # Without territory the copy has no map and doesn't track changed points,
+    # for copies that play and undo many moves without ever estimating territory
+    def copy(self, territory: bool = True) -> "Board":
+        board = Board(self.size, self.verify_history)
+        board.points[:] = self.points
+        board.hash = self.hash
+        board.history = set(self.history)
+        board.logged_positions = dict(self.logged_positions)
+        board.empty = list(self.empty)
+        board.empty_slot = list(self.empty_slot)
+        for color, chains in self.chains.items():
+            for chain in chains:
+                copied = Chain(color, set(chain.stones), set(chain.liberties))
+                board.chains[color][copied] = None
+                board.track_liberties(copied)
+                for stone in copied.stones:
+                    board.chain_of[stone] = copied
+        if territory and self.territory is not None:
+            board.territory = self.territory.copy(board)
+            board.changed_points = list(self.changed_points)
+        return board
+
+    # Index in the flat array of the point at (x, y)
+    def index_xy(self, x: int, y: int) -> int:
+        return (x + 1) * self.stride + y + 1
+
+    # Index in the flat array of a position
+    def index(self, pos: Position) -> int:
+        return (pos.x + 1) * self.stride + pos.y + 1
+
+    # Position of an index in the flat array
+    def position(self, index: int) -> Position:
+        return self.positions[index]
+
+    # Indices of every playable point
+    def indices(self) -> Iterator[int]:
+        for x in range(self.size):
+            start = self.index_xy(x, 0)
+            yield from range(start, start + self.size)
 
     # Check if a position fits in the board
     def in_bounds(self, pos: Position) -> bool:
@@ -20,37 +185,302 @@ class Board:
             pos = Position.tuple(pos)
         return 0 <= pos.x < self.size and 0 <= pos.y < self.size
 
-    # Set the color of a position on the board
+    # Get the color of a position on the board
     def get_color(self, pos: Position) -> Color:
         if not self.in_bounds(pos):
             raise ValueError(f"Position {pos} out of bounds")
-        return self.map[pos.x][pos.y]
+        return COLORS[self.points[(pos.x + 1) * self.stride + pos.y + 1]]
 
-    # Set the color of a position on the board
+    # Set the color of a position on the board, keeping the chains up to date.
+    # Captures are not resolved here, see rules.execute_move
     def set_color(self, pos: Position, color: Color) -> None:
         if not self.in_bounds(pos):
             raise ValueError(f"Position {pos} out of bounds")
-        self.map[pos.x][pos.y] = color
+        index = (pos.x + 1) * self.stride + pos.y + 1
+        if self.points[index] == color.value:
+            return
+        if self.points[index] != Color.EMPTY.value:
+            self.remove_stone(index)
+        if color != Color.EMPTY:
+            self.add_stone(index, color.value)
+
+    # Take an index out of the list of empty points,
+    # swapping the last empty point into its slot
+    def take_empty(self, index: int):
+        slot = self.empty_slot[index]
+        last = self.empty.pop()
+        if last != index:
+            self.empty[slot] = last
+            self.empty_slot[last] = slot
+        self.empty_slot[index] = -1
+
+    # Give an index back to the list of empty points
+    def give_empty(self, index: int):
+        self.empty_slot[index] = len(self.empty)
+        self.empty.append(index)
+
+    # Place a stone on an empty index, merging it with the adjacent chains.
+    # The record, if any, keeps what's needed to split the merge again
+    def add_stone(self, index: int, color: int, record: UndoRecord | None = None) -> Chain:
+        points = self.points
+        chain_of = self.chain_of
+        points[index] = color
+        self.hash ^= self.keys[color][index]
+        self.take_empty(index)
+        if self.changed_points is not None:
+            self.changed_points.append(index)
+        liberties = set()
+        merged = []
+        for neighbor in self.neighbors[index]:
+            value = points[neighbor]
+            if value == 0:
+                liberties.add(neighbor)
+            else:
+                chain = chain_of[neighbor]
+                chain.liberties.discard(index)
+                if value != color:
+                    self.track_liberties(chain)
+                elif chain not in merged:
+                    merged.append(chain)
+        if not merged:
+            chain = Chain(color, {index}, liberties)
+            self.chains[color][chain] = None
+        else:
+            # Merge the smaller chains into the largest one
+            chain = max(merged, key=lambda c: len(c.stones))
+            if record is not None:
+                record.merged = [other for other in merged if other is not chain]
+                record.liberties = chain.liberties | {index}
+            for other in merged:
+                if other is chain:
+                    continue
+                chain.stones |= other.stones
+                chain.liberties |= other.liberties
+                for stone in other.stones:
+                    chain_of[stone] = chain
+                del self.chains[color][other]
+                self.untrack_liberties(other)
+            chain.stones.add(index)
+            chain.liberties |= liberties
+        chain_of[index] = chain
+        self.track_liberties(chain)
+        return chain
+
+    # Take every stone of a chain off the board and return their indices
+    def remove_chain(self, chain: Chain) -> set[int]:
+        points = self.points
+        chain_of = self.chain_of
+        del self.chains[chain.color][chain]
+        self.untrack_liberties(chain)
+        keys = self.keys[chain.color]
+        for stone in chain.stones:
+            points[stone] = 0
+            chain_of[stone] = None
+            self.hash ^= keys[stone]
+            self.give_empty(stone)
+        if self.changed_points is not None:
+            self.changed_points.extend(chain.stones)
+        # The removed stones become liberties of the chains around them
+        neighbors = self.neighbors
+        for stone in chain.stones:
+            for neighbor in neighbors[stone]:
+                neighbor_chain = chain_of[neighbor]
+                if neighbor_chain is not None:
+                    neighbor_chain.liberties.add(stone)
+                    self.track_liberties(neighbor_chain)
+        return chain.stones
+
+    # Take a single stone off the board, splitting its chain if needed
+    def remove_stone(self, index: int):
+        chain = self.chain_of[index]
+        self.remove_chain(chain)
+        for stone in chain.stones:
+            if stone != index:
+                self.add_stone(stone, chain.color)
+
+    # Play a move: place the stone, capture the dead chains around it and
+    # log the resulting position. The move is assumed to be legal
+    def play(self, pos: Position, color: Color) -> UndoRecord:
+        return self.play_at(self.index(pos), color.value)
+
+    # Same as play, for an index and a color value
+    def play_at(self, index: int, color: int) -> UndoRecord:
+        record = UndoRecord(index, color, self.hash)
+        own = self.add_stone(index, color, record)
+        for neighbor in self.neighbors[index]:
+            chain = self.chain_of[neighbor]
+            if chain is not None and chain.color != color and not chain.liberties:
+                record.captured.append(chain)
+                self.remove_chain(chain)
+        if not own.liberties:
+            record.captured.append(own)
+            self.remove_chain(own)
+        record.logged = self.hash not in self.history
+        if record.logged:
+            self.log()
+        self.undo_stack.append(record)
+        return record
+
+    # Take back the last move played with play(), restoring the captured
+    # chains, the merged chains, the hash and the history
+    def undo(self) -> UndoRecord:
+        record = self.undo_stack.pop()
+        if record.logged:
+            self.history.discard(self.hash)
+            self.logged_positions.pop(self.hash, None)
+        for chain in reversed(record.captured):
+            self.restore_chain(chain)
+        self.lift_stone(record)
+        self.hash = record.hash
+        return record
+
+    # Put a captured chain back on the board. It has no liberties,
+    # just like right before it was captured
+    def restore_chain(self, chain: Chain):
+        points = self.points
+        chain_of = self.chain_of
+        self.chains[chain.color][chain] = None
+        for stone in chain.stones:
+            points[stone] = chain.color
+            chain_of[stone] = chain
+            self.take_empty(stone)
+        if self.changed_points is not None:
+            self.changed_points.extend(chain.stones)
+        neighbors = self.neighbors
+        for stone in chain.stones:
+            for neighbor in neighbors[stone]:
+                neighbor_chain = chain_of[neighbor]
+                if neighbor_chain is not None and neighbor_chain is not chain:
+                    neighbor_chain.liberties.discard(stone)
+                    self.track_liberties(neighbor_chain)
+
+    # Take the stone of a move off the board and split the chains it merged
+    def lift_stone(self, record: UndoRecord):
+        index = record.index
+        chain_of = self.chain_of
+        chain = chain_of[index]
+        self.points[index] = 0
+        chain_of[index] = None
+        self.give_empty(index)
+        if self.changed_points is not None:
+            self.changed_points.append(index)
+        if record.liberties is None:
+            del self.chains[chain.color][chain]
+            self.untrack_liberties(chain)
+        else:
+            chain.stones.discard(index)
+            for other in record.merged:
+                chain.stones -= other.stones
+                for stone in other.stones:
+                    chain_of[stone] = other
+                self.chains[chain.color][other] = None
+            chain.liberties = record.liberties
+        # The point is a liberty again for every chain around it,
+        # the split chains included
+        for neighbor in self.neighbors[index]:
+            neighbor_chain = chain_of[neighbor]
+            if neighbor_chain is not None:
+                neighbor_chain.liberties.add(index)
+                self.track_liberties(neighbor_chain)
+
+    # Move a chain to the bucket of its current liberty count.
+    # Empty buckets are dropped, so the smallest key is the weakest chain
+    def track_liberties(self, chain: Chain):
+        count = len(chain.liberties)
+        if count == chain.bucket:
+            return
+        buckets = self.liberty_buckets[chain.color]
+        if chain.bucket >= 0:
+            bucket = buckets[chain.bucket]
+            del bucket[chain]
+            if not bucket:
+                del buckets[chain.bucket]
+        bucket = buckets.get(count)
+        if bucket is None:
+            buckets[count] = bucket = {}
+        bucket[chain] = None
+        chain.bucket = count
+
+    # Take a chain that left the board out of its bucket
+    def untrack_liberties(self, chain: Chain):
+        if chain.bucket < 0:
+            return
+        buckets = self.liberty_buckets[chain.color]
+        bucket = buckets[chain.bucket]
+        del bucket[chain]
+        if not bucket:
+            del buckets[chain.bucket]
+        chain.bucket = -1
+
+    # Chains of a color value with the given number of liberties
+    def chains_with_liberties(self, color: int, count: int) -> Iterable[Chain]:
+        return self.liberty_buckets[color].get(count, {}).keys()
+
+    # A chain of a color value with the fewest liberties, None if there is none
+    def weakest_chain(self, color: int) -> Chain | None:
+        buckets = self.liberty_buckets[color]
+        if not buckets:
+            return None
+        return next(iter(buckets[min(buckets)]))
+
+    # Territory of white and black as rules.score_territories counts it.
+    # The first call floods the whole board, the next ones only the
+    # regions around the points that changed in between
+    def current_territory_estimate(self) -> tuple[float, float]:
+        return self.territory_map().estimate()
+
+    # Empty regions and their owners, brought up to date
+    def territory_map(self) -> TerritoryMap:
+        if self.territory is None:
+            self.territory = TerritoryMap(self)
+            self.changed_points = []
+        elif self.changed_points:
+            self.territory.update(self.changed_points)
+            self.changed_points.clear()
+        return self.territory
+
+    # Chain of the stone at a position, None if it is empty
+    def chain_at(self, pos: Position) -> Chain | None:
+        return self.chain_of[self.index(pos)]
+
+    # Stones of a chain as a group of positions
+    def chain_group(self, chain: Chain) -> Group:
+        return {self.position(stone) for stone in chain.stones}
+
+    # List of present white connected groups
+    @property
+    def white_groups(self) -> list[Group]:
+        return [self.chain_group(chain) for chain in self.chains[Color.WHITE.value]]
+
+    # List of present black connected groups
+    @property
+    def black_groups(self) -> list[Group]:
+        return [self.chain_group(chain) for chain in self.chains[Color.BLACK.value]]
 
     # Get in-bounds orthogonal neighbors of a position (including empty positions)
     def get_orthogonal_neighbors(self, pos: Position) -> set[Position]:
-        neighbors = set()
-        for direction in ORTHOGONAL_DIRECTIONS:
-            neighbor = pos + direction
-            if self.in_bounds(neighbor):
-                neighbors.add(neighbor)
-        return neighbors
-    
+        if not self.in_bounds(pos):
+            return set()
+        positions = self.positions
+        return {positions[neighbor] for neighbor in self.neighbors[self.index(pos)]}
+
     # Get an immutable copy of the map
     def get_map(self) -> tuple[tuple[Color, ...], ...]:
-        return tuple(tuple(row) for row in self.map)
+        return tuple(
+            tuple(COLORS[value] for value in self.points[self.index_xy(x, 0):self.index_xy(x, self.size)])
+            for x in range(self.size))
 
-    # Get an immutable copy of the log
-    def get_log(self) -> tuple[tuple[tuple[Color, ...], ...], ...]:
-        return tuple(tuple(tuple(row) for row in state) for state in self.various_positions)
-    
     # Add the current state to the log
     def log(self):
-        self.various_positions.append(tuple(tuple(row) for row in self.map))
-
+        self.history.add(self.hash)
+        if self.verify_history:
+            self.logged_positions[self.hash] = bytes(self.points)
 
+    # Check if a position was logged before. With verify_history the
+    # full position is compared too, to rule out hash collisions
+    def was_logged(self, hash: int, points: bytes | bytearray | None = None) -> bool:
+        if hash not in self.history:
+            return False
+        if self.verify_history and points is not None:
+            return self.logged_positions.get(hash) == points
+        return True
@@ -1,3 +1,4 @@
+import copy
 from go.types import Position, Color
 from go.player import Player
 from go.board import Board
@@ -26,6 +27,18 @@ class Game:
         self.is_finished = False
         self.event_listeners = []
     
+    # Copy of the game that shares no board or move lists with this one
+    # and has no listeners, so the AI can think on it in the background
+    def snapshot(self) -> "Game":
+        game = copy.copy(self)
+        game.board = self.board.copy()
+        game.white = copy.copy(self.white)
+        game.white.moves = list(self.white.moves)
+        game.black = copy.copy(self.black)
+        game.black.moves = list(self.black.moves)
+        game.event_listeners = []
+        return game
+
     # Add an event listener to receive events
     def add_listener(self, listener: GameEventListener):
         self.event_listeners.append(listener)
@@ -66,7 +79,6 @@ class Game:
         current_player.passes = 0
         self.white.captures += len(result.captured_by_white)
         self.black.captures += len(result.captured_by_black)
-        self.board.log()
         # Emit the events for capturing a stone
         if len(result.captured_by_white) > 0:
             event = StoneCapturedEvent(
@@ -138,6 +150,13 @@ class Game:
         black_total = self.black.captures + black_territory
         return white_total, black_total
     
+    # Score of the game if it ended now, from the territory estimate of the board
+    def current_score_estimate(self) -> tuple[float, float]:
+        white_territory, black_territory = self.board.current_territory_estimate()
+        white_total = self.white.captures + white_territory + self.komi
+        black_total = self.black.captures + black_territory
+        return white_total, black_total
+    
     # End the game, determine the winner
     def finish(self) -> Color | None:
         if self.is_finished:
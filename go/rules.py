@@ -1,6 +1,9 @@
-from copy import deepcopy
-from go.types import Position, Color, Group, ORTHOGONAL_DIRECTIONS
-from go.game import Board
+from go.types import Position, Color, Group
+from go.board import Board, Chain, COLORS
+
+EMPTY = Color.EMPTY.value
+BLACK = Color.BLACK.value
+WHITE = Color.WHITE.value
 
 class MoveResult:
     def __init__(self, 
@@ -15,14 +18,33 @@ class MoveResult:
         return f"result:\n{self.position}\ncaptured by white:{self.captured_by_white}\ncaptured by black{self.captured_by_black}"
 
 # -- LIBERTIES --
+# Number of liberties of a chain, kept up to date by the board
+def liberty_count(chain: Chain) -> int:
+    return len(chain.liberties)
+
+# Chains of a color with a single liberty left, from the buckets of the board
+def chains_in_atari(board: Board, color: Color) -> list[Chain]:
+    return list(board.chains_with_liberties(color.value, 1))
+
+# Chain of a color with the fewest liberties, None if the color has no stones
+def weakest_chain(board: Board, color: Color) -> Chain | None:
+    return board.weakest_chain(color.value)
+
 # Get the positions of the liberties of a group
+# A group that is a whole chain reads the liberties kept by the chain
 def get_liberties(board: Board, group: Group) -> set[Position]:
+    chain = board.chain_at(next(iter(group))) if group else None
+    if chain is not None and len(chain.stones) == len(group) \
+            and all(board.index(pos) in chain.stones for pos in group):
+        return {board.position(index) for index in chain.liberties}
+    points = board.points
     liberties = set()
+    neighbors = board.neighbors
     for pos in group:
-        for neighbor in board.get_orthogonal_neighbors(pos):
-            if board.get_color(neighbor) == Color.EMPTY:
+        for neighbor in neighbors[board.index(pos)]:
+            if points[neighbor] == EMPTY:
                 liberties.add(neighbor)
-    return liberties
+    return {board.position(index) for index in liberties}
 
 # Check if a group has at least one liberty
 def is_group_alive(board: Board, group: Group) -> bool:
@@ -31,91 +53,132 @@ def is_group_alive(board: Board, group: Group) -> bool:
 
 
 # -- GROUPS --
-# Find the stones that form a group at a given position
-def find_group_at(board: Board, pos: Position) -> Group:
-    color = board.get_color(pos)
-    group = Group()
+# Find the indices of the stones that form a group at a given index
+def find_group_indices(board: Board, index: int) -> set[int]:
+    points = board.points
+    neighbors = board.neighbors
+    color = points[index]
     # Flood fill algorithm
-    stack = [pos]
-    visited = set()
+    group = {index}
+    stack = [index]
     while stack:
         current = stack.pop()
-        if current in visited:
-            continue
-        visited.add(current)
-        if board.get_color(current) == color:
-            group.add(current)
-            for neighbor in board.get_orthogonal_neighbors(current):
-                if neighbor not in visited:
-                    stack.append(neighbor)
+        for neighbor in neighbors[current]:
+            if points[neighbor] == color and neighbor not in group:
+                group.add(neighbor)
+                stack.append(neighbor)
     return group
 
-# Find all groups of a given color
-def find_all_groups(board: Board, color: Color) -> list[Group]:
+# Find the stones that form a group at a given position
+def find_group_at(board: Board, pos: Position) -> Group:
+    return {board.position(index) for index in find_group_indices(board, board.index(pos))}
+
+# Find the index groups of the points holding a given color
+def find_all_group_indices(board: Board, color: Color) -> list[set[int]]:
+    points = board.points
+    value = color.value
     visited = set()
     groups = []
-    for x in range(board.size):
-        for y in range(board.size):
-            pos = Position(x, y)
-            if pos not in visited and board.get_color(pos) == color:
-                group = find_group_at(board, pos)
-                groups.append(group)
-                visited.update(group)
+    for index in board.indices():
+        if points[index] == value and index not in visited:
+            group = find_group_indices(board, index)
+            groups.append(group)
+            visited |= group
     return groups
 
+# Find all groups of a given color
+def find_all_groups(board: Board, color: Color) -> list[Group]:
+    return [{board.position(index) for index in group}
+            for group in find_all_group_indices(board, color)]
+
 # -- MOVE VALIDATION --
+# Get the enemy chains that placing a stone at an index would capture
+def get_captured_chains(board: Board, index: int, color: Color) -> list[Chain]:
+    opponent = WHITE if color.value == BLACK else BLACK
+    captured = []
+    for neighbor in board.neighbors[index]:
+        chain = board.chain_of[neighbor]
+        if chain is not None and chain.color == opponent and len(chain.liberties) == 1 and chain not in captured:
+            captured.append(chain)
+    return captured
+
 # Check if placing a stone surrounded by enemy stones
 # would be illegal (it's not if it has liberties after capturing)
 def would_be_suicide(board: Board, pos: Position, color: Color) -> bool:
-    # Simulate placing the stone
-    simulated_board = deepcopy(board)
-    move_result = execute_move(simulated_board, pos, color)
-    # If stones get captured, it's valid
-    captured_stones = move_result.captured_by_white if color == Color.WHITE else move_result.captured_by_black
-    if len(captured_stones) > 0:
-        return False
-    # Else, if the stone has disappeared from the board, it's suicide
-    elif simulated_board.get_color == Color.EMPTY:
-        return True
-    # In case it didn't capture nor get captured, it isn't suicide either
-    return False
+    return is_suicide_at(board, board.index(pos), color)
+
+# Same as would_be_suicide, for an index in the flat array of the board
+def is_suicide_at(board: Board, index: int, color: Color) -> bool:
+    points = board.points
+    own = color.value
+    for neighbor in board.neighbors[index]:
+        value = points[neighbor]
+        # An empty neighbor is a liberty for the new stone
+        if value == EMPTY:
+            return False
+        liberties = len(board.chain_of[neighbor].liberties)
+        # Connecting to a friendly chain keeps its other liberties,
+        # taking the last liberty of an enemy chain captures it
+        if value == own:
+            if liberties > 1:
+                return False
+        elif liberties == 1:
+            return False
+    return True
 
 # Check if the move would repeat a previous state (illegal)
+# The move is assumed not to be suicide
 def violates_ko(board: Board, pos: Position, color: Color) -> bool:
-    # Simulate the full move including captures
-    simulated_board = deepcopy(board)
-    execute_move(simulated_board, pos, color)
+    return violates_ko_at(board, board.index(pos), color)
+
+# Same as violates_ko, for an index in the flat array of the board
+def violates_ko_at(board: Board, index: int, color: Color) -> bool:
+    captured = get_captured_chains(board, index, color)
+    # Predict the hash of the position after the move and its captures
+    hash = board.hash ^ board.keys[color.value][index]
+    for chain in captured:
+        opponent_keys = board.keys[chain.color]
+        for stone in chain.stones:
+            hash ^= opponent_keys[stone]
     # Check if this state appeared before
-    simulated_map = simulated_board.get_map()
-    return simulated_map in board.get_log()
+    if hash not in board.history:
+        return False
+    if not board.verify_history:
+        return True
+    # Only build the resulting position to verify a matching hash
+    points = bytearray(board.points)
+    points[index] = color.value
+    for chain in captured:
+        for stone in chain.stones:
+            points[stone] = EMPTY
+    return board.was_logged(hash, points)
 
 # Check if a move is legal in general
 def is_move_legal(board: Board, pos: Position, color: Color) -> bool:
     if not board.in_bounds(pos):
         return False
-    if board.get_color(pos) != Color.EMPTY:
+    return is_legal_at(board, board.index(pos), color)
+
+# Same as is_move_legal, for an index in the flat array of the board
+def is_legal_at(board: Board, index: int, color: Color) -> bool:
+    if board.points[index] != EMPTY:
         return False
-    if would_be_suicide(board, pos, color):
+    if is_suicide_at(board, index, color):
         return False
-    if violates_ko(board, pos, color):
+    if violates_ko_at(board, index, color):
         return False
     return True
 
 # -- MOVE EXECUTION --
 # Execute a move on the board, thereby modifiyng it
-# The move is assumed to be legal
+# The move is assumed to be legal, it can be taken back with board.undo()
 def execute_move(board: Board, pos: Position, color: Color) -> MoveResult:
-    # Place the stone
-    board.set_color(pos, color)
-    opponent_color = Color.WHITE if color == Color.BLACK else Color.BLACK
-    # Capture groups with no liberties
-    rebuild_groups(board, color)
-    rebuild_groups(board, opponent_color)
-    captured_by_me = remove_dead_groups(board, opponent_color)
-    captured_by_opponent = remove_dead_groups(board, color)
-    # Update group structures
-    rebuild_groups(board, color)
-    rebuild_groups(board, opponent_color)
+    record = board.play(pos, color)
+    captured_by_me = set()
+    captured_by_opponent = set()
+    for chain in record.captured:
+        captured = captured_by_me if chain.color != color.value else captured_by_opponent
+        captured.update(board.position(stone) for stone in chain.stones)
     # Return the resulting information
     if color == Color.WHITE:
         return MoveResult(
@@ -130,59 +193,25 @@ def execute_move(board: Board, pos: Position, color: Color) -> MoveResult:
             captured_by_black=captured_by_me,
         )
 
-# Remove all dead groups of the given color
-# Returns the set of positions captured
-def remove_dead_groups(board: Board, color: Color) -> set[Position]:
-    captured = set()
-    groups_list = board.white_groups if color == Color.WHITE else board.black_groups
-    dead_groups = []
-    for group in groups_list:
-        liberties = get_liberties(board,group)
-        #if len(get_liberties(board, group)) == 0:
-        if len(liberties) == 0:
-            dead_groups.append(group)
-            captured.update(group)
-            for pos in group:
-                board.set_color(pos, Color.EMPTY)
-    for group in dead_groups:
-        groups_list.remove(group)
-    return captured
-
-# Rebuild the list of groups tracked by the board
-def rebuild_groups(board: Board, color: Color) -> None:
-    new_groups = find_all_groups(board, color)
-    if color == Color.WHITE:
-        board.white_groups = new_groups
-    else:
-        board.black_groups = new_groups
-
 
 # -- SCORING --
 # The name says it all...
 def find_empty_regions(board: Board) -> list[set[Position]]:
-    regions = []
-    visited = set()
-    for x in range(board.size):
-        for y in range(board.size):
-            pos = Position(x, y)
-            if board.get_color(pos) == Color.EMPTY and pos not in visited:
-                region = find_group_at(board, pos)
-                regions.append(region)
-                visited |= region
-    return regions
+    return find_all_groups(board, Color.EMPTY)
 
 # Determine which color controls an empty region
 def get_region_owner(board: Board, region: set[Position]) -> Color | None:
+    points = board.points
+    neighbors = board.neighbors
     bordering_colors = set()
     for pos in region:
-        for neighbor in board.get_orthogonal_neighbors(pos):
-            color = board.get_color(neighbor)
-            if color in [Color.BLACK, Color.WHITE]:
-                bordering_colors.add(color)
+        for neighbor in neighbors[board.index(pos)]:
+            bordering_colors.add(points[neighbor])
+    bordering_colors &= {BLACK, WHITE}
     if len(bordering_colors) > 1:
         return None  # Neutral territory
     elif len(bordering_colors) == 1:
-        return bordering_colors.pop()
+        return COLORS[bordering_colors.pop()]
     else:
         return None  # No bordering stones
 
@@ -0,0 +1,107 @@
+from typing import TYPE_CHECKING
+from go.types import Color
+
+if TYPE_CHECKING: # go.board imports this module
+    from go.board import Board
+
+EMPTY = Color.EMPTY.value
+BLACK = Color.BLACK.value
+WHITE = Color.WHITE.value
+
+# A connected set of empty points and the color that owns it.
+# Points are indices in the flat array of the board
+class Region:
+    __slots__ = ("points", "owner")
+    points: set[int]
+    owner: int # Color value of the only color bordering the region, EMPTY if none or both
+
+    def __init__(self, points: set[int], owner: int):
+        self.points = points
+        self.owner = owner
+
+    def __repr__(self):
+        return f"Region({Color(self.owner)}, {len(self.points)} points)"
+
+# Empty regions of a board and their owners, counted like rules.score_territories.
+# After a move only the regions around the changed points are flooded again
+class TerritoryMap:
+    board: "Board"
+    region_of: list[Region | None] # Region of the empty point at each index
+    regions: dict[Region, None] # Present regions, in insertion order
+    territory: list[int] # Points owned by each color value
+
+    def __init__(self, board: "Board"):
+        self.board = board
+        self.region_of = [None] * len(board.points)
+        self.regions = {}
+        self.territory = [0, 0, 0]
+        for index in board.empty:
+            if self.region_of[index] is None:
+                self.flood(index)
+
+    # Copy of the map for a copy of its board, with the same regions
+    # and owners, so the copy doesn't flood the whole board again
+    def copy(self, board: "Board") -> "TerritoryMap":
+        copied = object.__new__(TerritoryMap)
+        copied.board = board
+        copied.region_of = [None] * len(self.region_of)
+        copied.regions = {}
+        copied.territory = list(self.territory)
+        for region in self.regions:
+            region = Region(set(region.points), region.owner)
+            copied.regions[region] = None
+            for index in region.points:
+                copied.region_of[index] = region
+        return copied
+
+    # White and black territory
+    def estimate(self) -> tuple[float, float]:
+        return float(self.territory[WHITE]), float(self.territory[BLACK])
+
+    # Flood again the regions that hold or touch one of the changed points:
+    # they may have been split by a stone, merged by a capture or gained a border
+    def update(self, changed: list[int]):
+        points = self.board.points
+        neighbors = self.board.neighbors
+        region_of = self.region_of
+        seeds = set(changed)
+        for index in changed:
+            seeds.update(neighbors[index])
+        stale = {region_of[index] for index in seeds if region_of[index] is not None}
+        for region in stale:
+            self.drop(region)
+            seeds |= region.points
+        for index in seeds:
+            if points[index] == EMPTY and region_of[index] is None:
+                self.flood(index)
+
+    # Build the region of an empty point and find its owner
+    def flood(self, start: int) -> Region:
+        points = self.board.points
+        neighbors = self.board.neighbors
+        region_of = self.region_of
+        region = Region({start}, EMPTY)
+        stack = [start]
+        bordering = 0 # Bitwise or of the bordering colors, BLACK | WHITE when both
+        while stack:
+            current = stack.pop()
+            for neighbor in neighbors[current]:
+                value = points[neighbor]
+                if value != EMPTY:
+                    bordering |= value
+                elif neighbor not in region.points:
+                    region.points.add(neighbor)
+                    stack.append(neighbor)
+        if bordering == BLACK or bordering == WHITE:
+            region.owner = bordering
+        for index in region.points:
+            region_of[index] = region
+        self.regions[region] = None
+        self.territory[region.owner] += len(region.points)
+        return region
+
+    def drop(self, region: Region):
+        for index in region.points:
+            self.region_of[index] = None
+        del self.regions[region]
+        self.territory[region.owner] -= len(region.points)
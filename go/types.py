@@ -6,20 +6,38 @@ class Color(Enum):
     WHITE = 2
 
 # Representation of a position on the board
-# Essentially a tuple with two integers
+# Essentially a tuple with two integers, and equal to that tuple.
+# Instances are interned: Position(x, y) always returns the same immutable
+# object for the same coordinates, with its hash computed once
 class Position():
+    __slots__ = ("x", "y", "_hash")
     x: int
     y: int
+    _hash: int
 
-    def __init__(self, x: int, y: int):
-        self.x = x
-        self.y = y
+    def __new__(cls, x: int, y: int):
+        key = (x, y)
+        pos = _interned.get(key)
+        if pos is None:
+            pos = object.__new__(cls)
+            object.__setattr__(pos, "x", x)
+            object.__setattr__(pos, "y", y)
+            object.__setattr__(pos, "_hash", hash(key))
+            _interned[key] = pos
+        return pos
     
     @classmethod
     def tuple(cls, t: tuple):
         if len(t) == 2:
             return cls(t[0], t[1])
 
+    def __setattr__(self, name, value):
+        raise AttributeError("Position is immutable")
+
+    # Copies and pickles go through the interning as well
+    def __reduce__(self):
+        return (Position, (self.x, self.y))
+
     def __add__(self, other):
         return Position(self.x + other.x, self.y + other.y)
     
@@ -27,10 +45,16 @@ class Position():
         return Position(self.x - other.x, self.y - other.y)
     
     def __eq__(self, other):
-        return self.x == other.x and self.y == other.y
+        if self is other:
+            return True
+        if isinstance(other, Position):
+            return self.x == other.x and self.y == other.y
+        if isinstance(other, tuple):
+            return (self.x, self.y) == other
+        return NotImplemented
 
     def __hash__(self):
-        return hash((self.x, self.y))
+        return self._hash
     
     def __repr__(self):
         return f"({self.x}, {self.y})"
@@ -41,8 +65,12 @@ class Position():
     def __iter__(self):
         return iter((self.x, self.y))
 
+# Every Position created so far, by coordinates
+_interned: dict[tuple[int, int], Position] = {}
+
 # Left, Right, Up, Down
 ORTHOGONAL_DIRECTIONS = [Position(-1, 0), Position(1, 0), Position(0, -1), Position(0, 1)]
+DIAGONAL_DIRECTIONS = [Position(-1, -1), Position(-1, 1), Position(1, -1), Position(1, 1)]
 
 # Representation of a set of stones generally considered connected
 Group = set[Position]
\ No newline at end of file
@@ -1,6 +1,11 @@
+import argparse
 import pygame
 from game_manager import GameManager
 
 if __name__ == "__main__":
-    game_manager = GameManager()
+    parser = argparse.ArgumentParser(description="Go")
+    parser.add_argument("--profile", action="store_true", help="show frame timings on an overlay, F3 toggles it")
+    parser.add_argument("--profile-dump", default=None, help="write the timings of every frame to a CSV file")
+    args = parser.parse_args()
+    game_manager = GameManager(args.profile, args.profile_dump)
     game_manager.run()
\ No newline at end of file
@@ -0,0 +1,164 @@
+import argparse
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from dataclasses import dataclass
+from typing import Iterator
+from go.types import Color, Position
+from go.game import Game
+from events.game import GameEventListener, GameEventType
+from ai.ai_player import AIPlayer
+from ai.mcts import MCTS
+
+# Plays AIPlayer against AIPlayer without a window:
+# python selfplay.py --size 9 --games 20 --seed 1
+# Games can be spread over several processes with --workers,
+# every game is seeded with its own number so results don't depend on it
+
+@dataclass
+class GameRecord:
+    seed: int
+    winner: Color | None
+    white_score: float
+    black_score: float
+    moves: int # Stones placed and passes
+    duration_s: float
+    longest_move_ms: float # Slowest decision of either player
+    searches: int # Decisions made by MCTS
+    playouts: int # Playouts of all the searches
+    playouts_per_s: float # Mean speed of the searches
+
+# Notes when the game enters scoring, so the runner can finish it
+class ScoringListener(GameEventListener):
+    def __init__(self):
+        self.scoring = False
+
+    def on_game_event(self, event):
+        if event.type == GameEventType.SCORING_STARTED:
+            self.scoring = True
+
+# Make an AI player of the given kind, "heuristic" or "mcts".
+# time_budget_ms is the deadline of every move, clock_ms the time for the whole game
+def make_player(color: Color, kind: str, playouts: int | None, time_budget_ms: float | None,
+                clock_ms: float | None = None) -> AIPlayer:
+    mcts = MCTS(playouts, time_budget_ms) if kind == "mcts" else None
+    return AIPlayer(color, mcts, move_time_ms=time_budget_ms, clock_ms=clock_ms)
+
+# Play a single game between two AI players and return its record.
+# There is no dead stone selection, the game is scored as it stands
+def play_game(size: int, komi: float, seed: int, max_moves: int | None = None,
+              white: str = "heuristic", black: str = "heuristic",
+              playouts: int | None = None, time_budget_ms: float | None = None,
+              clock_ms: float | None = None) -> GameRecord:
+    random.seed(seed)
+    if max_moves is None:
+        max_moves = size * size * 3
+    start = time.perf_counter()
+    game = Game(size, komi)
+    game.white = make_player(Color.WHITE, white, playouts, time_budget_ms, clock_ms)
+    game.black = make_player(Color.BLACK, black, playouts, time_budget_ms, clock_ms)
+    listener = ScoringListener()
+    game.add_listener(listener)
+    moves = 0
+    searches = 0
+    playouts = 0
+    rates = 0.0
+    while not listener.scoring and moves < max_moves:
+        player = game.get_current_player()
+        move = player.decide_move(game)
+        if player.mcts is not None:
+            mcts = player.mcts
+            print(f"MCTS: {mcts.last_playouts} playouts ({mcts.last_playouts_per_s:.0f} playouts/s), "
+                  f"{len(mcts.table)} positions in the table")
+            searches += 1
+            playouts += mcts.last_playouts
+            rates += mcts.last_playouts_per_s
+        if isinstance(move, tuple):
+            move = Position.tuple(move)
+        if move == Position(-1, -1) or game.move_to(move) is None:
+            game.pass_turn()
+        moves += 1
+    winner = game.finish()
+    longest_move_ms = max(game.white.longest_move_ms, game.black.longest_move_ms)
+    return GameRecord(seed, winner, game.white.score, game.black.score, moves,
+                      time.perf_counter() - start, longest_move_ms,
+                      searches, playouts, rates / searches if searches else 0.0)
+
+# Play a game with the output of the AI players silenced, unless verbose.
+# This is what runs on the worker processes
+def play_game_quietly(args: argparse.Namespace, seed: int) -> GameRecord:
+    def play() -> GameRecord:
+        return play_game(args.size, args.komi, seed, args.max_moves,
+                         args.white, args.black, args.playouts, args.time_ms, args.clock_ms)
+    if args.verbose:
+        return play()
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        return play()
+
+# Play the games of a batch, yielding each record as soon as it's done.
+# With more than one worker, records come in the order the games finish
+def run_games(args: argparse.Namespace) -> Iterator[GameRecord]:
+    seeds = range(args.seed, args.seed + args.games)
+    if args.workers == 1:
+        for seed in seeds:
+            yield play_game_quietly(args, seed)
+        return
+    with ProcessPoolExecutor(max_workers=args.workers or None) as executor:
+        futures = [executor.submit(play_game_quietly, args, seed) for seed in seeds]
+        for future in as_completed(futures):
+            yield future.result()
+
+# Print the aggregated results of a batch of games
+def report(records: list[GameRecord], elapsed_s: float):
+    games = len(records)
+    white_wins = sum(1 for record in records if record.winner == Color.WHITE)
+    black_wins = sum(1 for record in records if record.winner == Color.BLACK)
+    lengths = [record.moves for record in records]
+    margins = [record.white_score - record.black_score for record in records]
+    # 95% confidence interval of the white win rate (normal approximation)
+    white_rate = white_wins / games
+    interval = 1.96 * (white_rate * (1 - white_rate) / games) ** 0.5
+    print(f"games: {games} in {elapsed_s:.2f}s ({games / elapsed_s:.2f} games/s, {sum(lengths) / elapsed_s:.1f} moves/s)")
+    print(f"white wins: {white_wins} ({white_rate:.1%} +/- {interval:.1%}), black wins: {black_wins} ({black_wins / games:.1%}), draws: {games - white_wins - black_wins}")
+    print(f"length: mean {statistics.mean(lengths):.1f}, median {statistics.median(lengths)}, "
+          f"min {min(lengths)}, max {max(lengths)} moves")
+    print(f"longest move: {max(record.longest_move_ms for record in records):.0f}ms")
+    searches = sum(record.searches for record in records)
+    if searches:
+        playouts = sum(record.playouts for record in records)
+        rate = sum(record.playouts_per_s * record.searches for record in records) / searches
+        print(f"search: {playouts / searches:.0f} playouts per move, {rate:.0f} playouts/s")
+    print(f"margin (white - black): mean {statistics.mean(margins):+.1f}, median {statistics.median(margins):+.1f}")
+
+def parse_args(args: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Headless AI vs AI self-play")
+    parser.add_argument("--size", type=int, default=9, help="board size")
+    parser.add_argument("--komi", type=float, default=6.5)
+    parser.add_argument("--games", type=int, default=10, help="number of games to play")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game, the next ones count up from it")
+    parser.add_argument("--max-moves", type=int, default=None, help="end a game after this many moves (default: 3 * size^2)")
+    parser.add_argument("--white", choices=("heuristic", "mcts"), default="heuristic", help="AI playing white")
+    parser.add_argument("--black", choices=("heuristic", "mcts"), default="heuristic", help="AI playing black")
+    parser.add_argument("--playouts", type=int, default=None, help="playouts per MCTS move")
+    parser.add_argument("--time-ms", type=float, default=None, help="wall-clock deadline of every move")
+    parser.add_argument("--clock-ms", type=float, default=None, help="wall-clock time of each player for the whole game")
+    parser.add_argument("--workers", type=int, default=1, help="processes to play on (0: one per CPU core)")
+    parser.add_argument("--verbose", action="store_true", help="show the output of the AI players")
+    return parser.parse_args(args)
+
+def main(args: list[str] | None = None):
+    args = parse_args(args)
+    records = []
+    start = time.perf_counter()
+    for record in run_games(args):
+        records.append(record)
+        winner = record.winner.name if record.winner is not None else "DRAW"
+        print(f"game {len(records)}/{args.games} (seed {record.seed}): {winner} "
+              f"W {record.white_score} - B {record.black_score}, {record.moves} moves, {record.duration_s:.2f}s")
+    report(records, time.perf_counter() - start)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import pytest
+from go.board import Board
+from go.types import Color
+from go import rules
+
+np = pytest.importorskip("numpy")
+from ai.batch import BatchPlayouts, board_to_array
+
+# Seeded batch playouts replayed move by move on Boards: no batch move may
+# be suicide or retake a ko at once (positional superko is ignored by the
+# batch), each must leave the same stones, and the games must score the
+# same territory as rules.score_territories
+
+@pytest.mark.parametrize("size", [5, 9, 13])
+def test_batch_matches_board(size: int):
+    count = 32
+    batch = BatchPlayouts.from_board(Board(size), Color.BLACK, count, seed=size)
+    boards = [Board(size) for _ in range(count)]
+    # Hash before the opponent's last move, None if they passed
+    retaken: list[int | None] = [None] * count
+    while True:
+        active = ~batch.finished & (batch.moves < size * size * 2)
+        if not active.any():
+            break
+        before = batch.boards.copy()
+        colors = batch.to_move.copy()
+        batch.step(active)
+        for k in np.flatnonzero(active):
+            placed = np.argwhere((before[k] == Color.EMPTY.value) & (batch.boards[k] == colors[k]))
+            board = boards[k]
+            if len(placed) == 0:
+                retaken[k] = None
+                continue
+            index = board.index_xy(int(placed[0][0]), int(placed[0][1]))
+            color = Color(int(colors[k]))
+            assert not rules.is_suicide_at(board, index, color)
+            hash = board.hash
+            board.play_at(index, color.value)
+            assert board.hash != retaken[k]
+            assert np.array_equal(board_to_array(board), batch.boards[k])
+            retaken[k] = hash
+    white, black = batch.score_territories()
+    for k, board in enumerate(boards):
+        assert (white[k], black[k]) == rules.score_territories(board)
@@ -0,0 +1,80 @@
+import random
+import pytest
+from go.board import Board
+from go.types import Color
+from go import rules
+
+# Random games with undos mixed in. After every undo the board must be
+# exactly the board reached by replaying, on a fresh one, only the moves
+# still on its undo stack: same stones, chains, liberties, hash and history
+
+# Everything the position is made of, in a form that compares by value
+def state(board: Board) -> tuple:
+    chains = sorted((chain.color, sorted(chain.stones), sorted(chain.liberties))
+                    for chains in board.chains.values() for chain in chains)
+    return bytes(board.points), board.hash, set(board.history), sorted(board.empty), chains
+
+# The bookkeeping derived from the stones must agree with them
+def check_consistent(board: Board):
+    for index in board.indices():
+        chain = board.chain_of[index]
+        if board.points[index] == Color.EMPTY.value:
+            assert chain is None
+            assert board.empty[board.empty_slot[index]] == index
+        else:
+            assert chain is not None and index in chain.stones
+            assert chain.color == board.points[index]
+            assert board.empty_slot[index] == -1
+    for color, chains in board.chains.items():
+        for chain in chains:
+            liberties = {neighbor for stone in chain.stones for neighbor in board.neighbors[stone]
+                         if board.points[neighbor] == Color.EMPTY.value}
+            assert chain.liberties == liberties
+            assert chain in board.liberty_buckets[color][len(liberties)]
+        bucketed = [chain for bucket in board.liberty_buckets[color].values() for chain in bucket]
+        assert all(bucketed) and len(bucketed) == len(chains)
+
+def replay(size: int, moves: list[tuple[int, int]]) -> Board:
+    board = Board(size)
+    for index, color in moves:
+        board.play_at(index, color)
+    return board
+
+# A random legal move of the color, None if there is none
+def random_move(board: Board, color: Color, rng: random.Random) -> int | None:
+    empty = list(board.empty)
+    rng.shuffle(empty)
+    return next((index for index in empty if rules.is_legal_at(board, index, color)), None)
+
+def opponent(color: Color) -> Color:
+    return Color.WHITE if color == Color.BLACK else Color.BLACK
+
+@pytest.mark.parametrize("size", [5, 9, 13])
+@pytest.mark.parametrize("seed", range(8))
+def test_undo_matches_replay(size: int, seed: int):
+    rng = random.Random(seed)
+    board = Board(size)
+    moves = [] # Moves on the undo stack, as index and color value
+    color = Color.BLACK
+    for _ in range(size * size * 3):
+        if moves and rng.random() < 0.25:
+            for _ in range(rng.randint(1, min(3, len(moves)))):
+                board.undo()
+                moves.pop()
+            check_consistent(board)
+            assert state(board) == state(replay(size, moves))
+            color = opponent(Color(moves[-1][1])) if moves else Color.BLACK
+            continue
+        index = random_move(board, color, rng)
+        if index is not None:
+            board.play_at(index, color.value)
+            moves.append((index, color.value))
+        color = opponent(color)
+    check_consistent(board)
+    assert state(board) == state(replay(size, moves))
+    # Taking everything back gives an empty board
+    while moves:
+        board.undo()
+        moves.pop()
+    check_consistent(board)
+    assert state(board) == state(Board(size))
@@ -0,0 +1,66 @@
+import random
+import pytest
+from go.board import Board
+from go.types import Color
+from go import rules
+
+# The territory map is brought up to date from the changed points only.
+# Whatever the moves, undos and copies in between, its estimate must be
+# what rules.score_territories counts from scratch
+
+def opponent(color: Color) -> Color:
+    return Color.WHITE if color == Color.BLACK else Color.BLACK
+
+# A random legal move of the color, None if there is none
+def random_move(board: Board, color: Color, rng: random.Random) -> int | None:
+    empty = list(board.empty)
+    rng.shuffle(empty)
+    return next((index for index in empty if rules.is_legal_at(board, index, color)), None)
+
+@pytest.mark.parametrize("size", [5, 9, 13])
+@pytest.mark.parametrize("seed", range(8))
+def test_estimate_matches_score(size: int, seed: int):
+    rng = random.Random(seed)
+    boards = [Board(size)]
+    colors = [Color.BLACK]
+    boards[0].territory_map()
+    for _ in range(size * size * 3):
+        which = rng.randrange(len(boards))
+        board = boards[which]
+        roll = rng.random()
+        if roll < 0.05:
+            boards.append(board.copy())
+            colors.append(colors[which])
+            continue
+        if roll < 0.25 and board.undo_stack:
+            board.undo()
+        else:
+            index = random_move(board, colors[which], rng)
+            if index is not None:
+                board.play_at(index, colors[which].value)
+        colors[which] = opponent(colors[which])
+        if rng.random() < 0.5:
+            assert board.current_territory_estimate() == rules.score_territories(board)
+            assert sum(len(region.points) for region in board.territory.regions) == len(board.empty)
+    for board in boards:
+        assert board.territory.board is board
+        assert board.current_territory_estimate() == rules.score_territories(board)
+
+# A copy made without the map keeps no changed points, however many
+# moves are played and undone on it
+def test_copy_without_territory():
+    rng = random.Random(0)
+    board = Board(9)
+    board.territory_map()
+    copied = board.copy(territory=False)
+    assert copied.territory is None and copied.changed_points is None
+    color = Color.BLACK
+    for _ in range(200):
+        index = random_move(copied, color, rng)
+        if index is not None:
+            copied.play_at(index, color.value)
+        color = opponent(color)
+    while copied.undo_stack:
+        copied.undo()
+    assert copied.changed_points is None
+    assert copied.current_territory_estimate() == rules.score_territories(copied)
@@ -0,0 +1,28 @@
+import pygame
+from globals import IMAGE
+
+# Images already loaded, by file name. They are shared by every Sprite
+_images: dict[str, pygame.surface.Surface] = {}
+_shared: set[pygame.surface.Surface] = set() # The same surfaces, to recognize them
+
+# Load an image from the assets once, converted to the format of the window
+# so blitting it needs no conversion. The surface is shared: never draw on it
+# nor change its alpha, copy it instead
+def load_image(name: str) -> pygame.surface.Surface:
+    image = _images.get(name)
+    if image is None:
+        image = pygame.image.load(IMAGE + name)
+        # Converting needs the window to exist
+        if pygame.display.get_surface() is not None:
+            image = image.convert_alpha()
+        _images[name] = image
+        _shared.add(image)
+    return image
+
+# Check if a surface is an image handed out by load_image, which is never changed
+def is_shared_image(surface: pygame.surface.Surface) -> bool:
+    return surface in _shared
+
+# Size of an image from the assets, without making a Sprite of it
+def image_size(name: str) -> tuple[int, int]:
+    return load_image(name).get_size()
@@ -6,6 +6,7 @@ from go.board import Board
 from ui.widgets.element import UIElement
 from ui.views.view import UIView
 from ui.widgets.sprite import Sprite
+from ui.assets import image_size
 from animation.animator import Animator, fade_out_element
 from animation.animation import Animation
 from animation import easing
@@ -30,7 +31,7 @@ class BoardView(UIView):
     def set_board_size(self, board_size):
         self.board_size = board_size
         self.stone_scale = 8.0/board_size
-        self.stone_size, _ = Sprite("stone_white.png").surface.get_size()
+        self.stone_size, _ = image_size("stone_white.png")
         self.stones = [[None for _ in range(self.board_size)] for _ in range(self.board_size)]
         self.stone_shadows = [[None for _ in range(self.board_size)] for _ in range(self.board_size)]
         self.init_lines()
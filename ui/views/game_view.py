@@ -78,4 +78,8 @@ class GameView(UIView, GameEventListener):
         self.game.remove_selected_stones(selected_stones)
     
     def on_game_event(self, event):
+        match event.type:
+            case GameEventType.GAME_STARTED | GameEventType.STONE_PLACED:
+                # Live score estimate, the territory is only updated around the move
+                self.go_view.score_view.update_estimate(*self.game.current_score_estimate())
         self.notify_change()
\ No newline at end of file
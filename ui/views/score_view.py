@@ -1,6 +1,6 @@
 from typing import Callable
 import pygame
-from globals import WIDTH, HEIGHT, TEXT_NORMAL, TEXT_BIG
+from globals import WIDTH, HEIGHT, TEXT_SMALL, TEXT_NORMAL, TEXT_BIG
 from go.types import Color
 from go.game import Game
 from events.game import GameEventListener, GameEventType
@@ -26,6 +26,10 @@ class ScoreView(UIView):
         self.white_scoremark.scale = 0.6
         self.black_scoremark = TextSprite(TEXT_BIG, pygame.Color("white"), "score_black.png")
         self.black_scoremark.scale = 0.6
+        # Label for the live estimate of who is ahead
+        self.estimate_label = TextSprite(TEXT_SMALL, pygame.Color("white"), "text_label.png")
+        self.estimate_label.scale = 0.6
+        self.estimate_label.center_at((self.width*0.8, self.height*0.45))
         # Button to pass the turn
         self.pass_turn_button = TextSpriteButton(TEXT_BIG, pygame.Color("white"), "text_label.png")
         self.pass_turn_button.scale = 0.6
@@ -36,6 +40,7 @@ class ScoreView(UIView):
         self.add_element(self.stone_holders)
         self.add_element(self.white_scoremark)
         self.add_element(self.black_scoremark)
+        self.add_element(self.estimate_label)
         self.add_element(self.pass_turn_button)
         self.render()
 
@@ -52,6 +57,17 @@ class ScoreView(UIView):
             self.black_scoremark.set_text(f"{captured_by:3.1f}")
         self.notify_change()
 
+    # Show the lead of the estimated score, territory included
+    def update_estimate(self, white_score: float, black_score: float):
+        lead = white_score - black_score
+        if lead > 0:
+            self.estimate_label.set_text(f"W+{lead:.1f}")
+        elif lead < 0:
+            self.estimate_label.set_text(f"B+{-lead:.1f}")
+        else:
+            self.estimate_label.set_text("EVEN")
+        self.notify_change()
+
     def init_scoremarks(self, white_main: bool):
         # Set the position of the scoremarks
         scoremark_x = self.width*0.8
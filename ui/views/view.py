@@ -3,6 +3,8 @@ import pygame
 from ui.widgets.element import UIElement
 from ui.widgets.button import Button
 
+MAX_REPAIR_RECTS = 16 # Above this, the whole canvas is composed again
+
 # Representation of a composition of UI elements,
 # which is in itself, a UI element
 class UIView(UIElement):
@@ -10,11 +12,15 @@ class UIView(UIElement):
     layers: list[list[UIElement]]
     width: float
     height: float
+    _pending: dict[UIElement, None] # Children that changed since the last render
+    _damage: list[pygame.Rect] # Areas of removed children, still on the canvas
 
     def __init__(self, width: float, height: float):
         super().__init__()
         self.all_children = []
         self.layers = []
+        self._pending = {}
+        self._damage = []
         self.width = width
         self.height = height
         self.add_layer()
@@ -26,20 +32,61 @@ class UIView(UIElement):
     @enabled.setter
     def enabled(self, value: bool):
         self._enabled = value
+        self.mark_moved()
         #for layer in self.layers:
             #for element in layer:
                 #element.enabled = value
 
+    # A view is drawn from its children, which report their own changes,
+    # so there is nothing to compose again. It only renders the changed areas
+    def notify_change(self):
+        self.touch()
+
+    def child_changed(self, child: UIElement):
+        if child in self._pending:
+            return
+        self._pending[child] = None
+        self.touch()
+
     def compose(self) -> pygame.surface.Surface:
+        self.take_pending()
         canvas = pygame.surface.Surface((self.width, self.height), pygame.SRCALPHA)
-        for layer in self.layers[1:]:
-            for element in layer:
-                element.draw_on(canvas)
-        if len(self.layers[0]) > 0:
-            for button in self.layers[0]:
-                button.draw_on(canvas)
+        self.draw_children(canvas)
         return canvas
 
+    # Draw the changed children again on the canvas, only where they are and were.
+    # The whole canvas is composed again if too many areas changed
+    def repair(self) -> list[pygame.Rect]:
+        rects = self.take_pending()
+        if len(rects) > MAX_REPAIR_RECTS:
+            self._cached_composed = self.compose()
+            return [self._cached_composed.get_rect()]
+        canvas = self._cached_composed
+        rects = merge_rects(rects, canvas.get_rect())
+        for rect in rects:
+            canvas.set_clip(rect)
+            canvas.fill((0, 0, 0, 0))
+            self.draw_children(canvas, rect)
+        canvas.set_clip(None)
+        return rects
+
+    # Areas to draw again for the removed and changed children
+    def take_pending(self) -> list[pygame.Rect]:
+        rects = self._damage
+        self._damage = []
+        for child in self._pending:
+            rects.extend(child.take_changes())
+        self._pending.clear()
+        return rects
+
+    # Draw the children in the order of the layers, buttons on top.
+    # With an area, only the children that overlap it are drawn
+    def draw_children(self, canvas: pygame.surface.Surface, area: pygame.Rect | None = None):
+        for layer in self.layers[1:] + self.layers[:1]:
+            for element in layer:
+                if area is None or (element._drawn_rect is not None and area.colliderect(element._drawn_rect)):
+                    element.draw_on(canvas)
+
     def add_layer(self):
         self.layers.append(list())
     
@@ -51,6 +98,8 @@ class UIView(UIElement):
             self.add_layer()
         self.layers[layer].append(element)
         element.parent = self
+        element._moved = True
+        self.child_changed(element)
 
     def remove_element(self, removed_element: UIElement):
         is_element_present = False
@@ -64,9 +113,32 @@ class UIView(UIElement):
                 layer = layer
                 break
         layer.remove(removed_element)
+        # Its area is drawn again without it
+        if removed_element._drawn_rect is not None:
+            self._damage.append(removed_element._drawn_rect)
+        self._pending.pop(removed_element, None)
+        removed_element.parent = None
+        removed_element._moved = False
+        removed_element._drawn_rect = None
+        self.touch()
     
     def poll_buttons(self, origin: tuple[float, float], mouse_pos: tuple[int, int]):
         mouse_pos = (mouse_pos[0]-origin[0], mouse_pos[1]-origin[1])
         for element in self.layers[0]:
             if element.enabled:
-                element.poll((self.x, self.y), mouse_pos)
\ No newline at end of file
+                element.poll((self.x, self.y), mouse_pos)
+
+# Clip the areas to the bounds and join the overlapping ones,
+# so no pixel is drawn twice when a child moves a little
+def merge_rects(rects: list[pygame.Rect], bounds: pygame.Rect) -> list[pygame.Rect]:
+    merged = []
+    for rect in rects:
+        rect = rect.clip(bounds)
+        if not rect:
+            continue
+        index = rect.collidelist(merged)
+        while index != -1:
+            rect.union_ip(merged.pop(index))
+            index = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
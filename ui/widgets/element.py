@@ -1,6 +1,17 @@
 from abc import ABC, abstractmethod
+from functools import lru_cache
 import pygame
+import frame_profiler
+from ui.assets import is_shared_image
 
+SCALE_STEP = 0.01 # Scales are rounded to this, so close ones share a surface
+TRANSFORM_CACHE_SIZE = 512 # Scaled and rotated surfaces kept
+
+# Elements are retained: each one keeps its composed surface, and its parent
+# keeps the canvas it was drawn on. A change of position, opacity, scale or
+# rotation only marks the area of the element on its parent to be drawn again,
+# and the parent redraws just that area of its canvas on the next render.
+# Only notify_change() composes an element again
 class UIElement(ABC):
     def __init__(self):
         self._x = 0
@@ -13,15 +24,65 @@ class UIElement(ABC):
         self._composed = False
         self._rendered = False
         self._cached_composed = None
+        self._moved = False # Its whole area on the parent must be drawn again
+        self._drawn_rect = None # Area it covers on the parent, None if it isn't drawn
+        self._repaired = [] # Areas of its composed surface that changed on the last render
         self.parent = None # Another UIElement
 
     # Every UIElement should call notify_chaange()
-    # if it needs to be rendered again
+    # if it needs to be composed again
     def notify_change(self):
         self._composed = False
         self._rendered = False
+        self.mark_moved()
+
+    # The transform changed: render again, without composing
+    def notify_transform(self):
+        self._rendered = False
+        self.mark_moved()
+
+    # The area the element covers on its parent, before and after the change,
+    # is drawn again on the next render of the parent
+    def mark_moved(self):
+        if self._moved:
+            return
+        self._moved = True
         if self.parent is not None:
-            self.parent.notify_change()
+            self.parent.child_changed(self)
+
+    # Some of the surface changed, render again and let the ancestors know
+    def touch(self):
+        self._rendered = False
+        if self.parent is not None:
+            self.parent.child_changed(self)
+
+    # Area the element would cover on its parent now, None if it isn't drawn
+    def current_rect(self) -> pygame.Rect | None:
+        if not self._enabled or self._opacity == 0:
+            return None
+        if not self._rendered:
+            self.render()
+        return pygame.Rect((self.x, self.y), self.surface.get_size())
+
+    # Areas of the parent to draw again since the last call, in its coordinates.
+    # Call it once the element is rendered
+    def take_changes(self) -> list[pygame.Rect]:
+        rect = self.current_rect()
+        changes = []
+        if self._moved:
+            if self._drawn_rect is not None:
+                changes.append(self._drawn_rect)
+            if rect is not None:
+                changes.append(rect)
+        elif self._repaired and rect is not None:
+            if self.scale != 1.0 or self.rotation != 0:
+                changes.append(rect)
+            else:
+                changes.extend(repaired.move(rect.topleft).clip(rect) for repaired in self._repaired)
+        self._moved = False
+        self._repaired = []
+        self._drawn_rect = rect
+        return changes
     
     @property
     def enabled(self):
@@ -30,6 +91,7 @@ class UIElement(ABC):
     @enabled.setter
     def enabled(self, value: bool):
         self._enabled = value
+        self.mark_moved()
 
     @property
     def x(self):
@@ -38,8 +100,7 @@ class UIElement(ABC):
     @x.setter
     def x(self, value: float):
         self._x = value
-        if self.parent is not None:
-            self.notify_change()
+        self.mark_moved()
 
     @property
     def y(self):
@@ -48,8 +109,7 @@ class UIElement(ABC):
     @y.setter
     def y(self, value: float):
         self._y = value
-        if self.parent is not None:
-            self.notify_change()
+        self.mark_moved()
     
     @property
     def opacity(self):
@@ -59,7 +119,7 @@ class UIElement(ABC):
     def opacity(self, value: float):
         if value >= 0 and value <= 255:
             self._opacity = value
-            self.notify_change()
+            self.notify_transform()
         else:
             raise ValueError(f"{value} not within opacity range.")
 
@@ -70,7 +130,7 @@ class UIElement(ABC):
     @scale.setter
     def scale(self, value: float):
         self._scale = value
-        self.notify_change()
+        self.notify_transform()
 
     @property
     def rotation(self):
@@ -79,31 +139,47 @@ class UIElement(ABC):
     @rotation.setter
     def rotation(self, value: float):
         self._rotation = value
-        self.notify_change()
+        self.notify_transform()
     
     # Blit everything into one composed surface
     @abstractmethod
     def compose(self) -> pygame.surface.Surface:
         pass
 
+    # Draw again the changed areas of the composed surface and return them.
+    # Nothing changes within a plain element, it is composed again instead
+    def repair(self) -> list[pygame.Rect]:
+        return []
+
     # Apply the transform on the composed surface
     # It effectively applies any changes
     def render(self):
         if self._rendered:
             return
-        if not self._composed:
-            self._cached_composed = self.compose()
-            self.notify_change()
-        surface = self._cached_composed.copy()
-        # Alpha
-        if self.opacity != 1.0:
-            surface.set_alpha(int(self.opacity*255))
-        # Scale
-        if self.scale != 1.0:
-            surface = pygame.transform.scale_by(surface, self.scale)
-        # Rotate
-        if self.rotation != 0:
-            surface = pygame.transform.rotate(surface, self.rotation)
+        with frame_profiler.span("compose"):
+            if not self._composed:
+                self._cached_composed = self.compose()
+                self._composed = True
+                self._repaired = [self._cached_composed.get_rect()]
+                if frame_profiler.active is not None:
+                    frame_profiler.active.count_compose(self)
+            else:
+                self._repaired = self.repair()
+        with frame_profiler.span("render"):
+            # The composed surface is used as it is when there is no transform
+            surface = self._cached_composed
+            # Scale and rotate. Shared images get a transform shared with the
+            # elements transformed alike, other surfaces may change in place
+            if self.scale != 1.0 or self.rotation != 0:
+                scale = round(self.scale / SCALE_STEP) * SCALE_STEP
+                if is_shared_image(surface):
+                    surface = transformed(surface, scale, self.rotation)
+                else:
+                    surface = transform(surface, scale, self.rotation)
+            # Alpha, on a copy as the surface may be shared
+            if self.opacity != 1.0:
+                surface = surface.copy()
+                surface.set_alpha(int(self.opacity*255))
         self._rendered = True
         self.surface = surface
 
@@ -123,12 +199,31 @@ class UIElement(ABC):
         return (x, y)
 
     def draw_on(self, destination: pygame.surface.Surface):
-        if self.enabled:
-            if self._opacity == 0:
-                return
-            if not self._rendered or not self._composed:
+        if self.enabled and self._opacity != 0:
+            if not self._rendered:
                 self.render()
             destination.blit(self.surface, (self.x, self.y))
     
     def __repr__(self):
-        return f"{self.x}, {self.y}, {self.opacity}, {self.scale}, {self.rotation}, {self.enabled}, {self.surface}"
\ No newline at end of file
+        return f"{self.x}, {self.y}, {self.opacity}, {self.scale}, {self.rotation}, {self.enabled}, {self.surface}"
+
+# A surface scaled and then rotated
+def transform(surface: pygame.surface.Surface, scale: float, rotation: float) -> pygame.surface.Surface:
+    if scale != 1.0:
+        surface = pygame.transform.scale_by(surface, scale)
+    if rotation != 0:
+        surface = pygame.transform.rotate(surface, rotation)
+    return surface
+
+_cached_transform = lru_cache(maxsize=TRANSFORM_CACHE_SIZE)(transform)
+
+# The transform of a shared image from the assets. The same image, scale and
+# rotation give back the same surface, so it must not be changed either: copy
+# it to draw on it or change its alpha. Only shared images are accepted, as a
+# surface that changes in place would get a stale transform, and one composed
+# again would keep its old versions alive in the cache
+def transformed(surface: pygame.surface.Surface, scale: float, rotation: float) -> pygame.surface.Surface:
+    if not is_shared_image(surface):
+        raise ValueError("Only shared images from the assets have cached transforms")
+    return _cached_transform(surface, scale, rotation)
+
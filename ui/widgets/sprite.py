@@ -1,5 +1,5 @@
 import pygame
-from globals import IMAGE
+from ui.assets import load_image
 from ui.widgets.element import UIElement
 
 class Sprite(UIElement):
@@ -8,13 +8,15 @@ class Sprite(UIElement):
     def __init__(self, src_image: str | pygame.surface.Surface):
         super().__init__()
         if isinstance(src_image, str):
-            self.src_image = pygame.image.load(IMAGE + src_image)
+            self.src_image = load_image(src_image)
         else:
             self.src_image = src_image
         self.render()
     
+    # The source image is shared with the other sprites of the same file,
+    # render() copies it before changing its alpha
     def compose(self) -> pygame.surface.Surface:
-        return self.src_image.copy()
+        return self.src_image
 
 from ui.widgets.text import Text
 
@@ -53,6 +55,7 @@ class TextSpriteButton(TextSprite, Button):
     def x(self, value: float):
         self._x = value
         self.update_bounding_box(self.surface, self.x, self.y)
+        self.mark_moved()
 
     @property
     def y(self):
@@ -61,4 +64,5 @@ class TextSpriteButton(TextSprite, Button):
     @y.setter
     def y(self, value: float):
         self._y = value
-        self.update_bounding_box(self.surface, self.x, self.y)
\ No newline at end of file
+        self.update_bounding_box(self.surface, self.x, self.y)
+        self.mark_moved()
\ No newline at end of file